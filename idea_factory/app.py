@@ -2,19 +2,22 @@
 
 import json
 import os
+import threading
 import uuid
 from datetime import datetime
 from functools import wraps
 
-from flask import Flask, render_template, request, session, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, session, redirect, url_for, flash, jsonify
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from dotenv import load_dotenv
 
-from bender_quotes import get_random_quote
-from openai_client import IdeaGenerator
-from sheets import SheetsClient
-from bender_audio import play_bender_audio
+from bender_quotes import get_all_quotes, get_random_quote
+from bender_audio import play_bender_audio, prewarm_bender_audio
+from jobs import JobManager
+from journal import RowJournal, SheetsWriter
+from mirror import RowMirror
+from store import DEFAULT_STORE_URL, ServerSessionInterface
 
 # Load environment variables
 load_dotenv()
@@ -22,23 +25,70 @@ load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.getenv('APP_SECRET_KEY', 'dev-secret-key-change-in-production')
 
+# Sessions and rate limits live in a store shared by all workers, the cookie only holds a session ID
+app.session_interface = ServerSessionInterface()
+
 # Initialize rate limiter
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    storage_uri=os.getenv('STORE_URL', DEFAULT_STORE_URL)
 )
 
-# Initialize clients
-idea_generator = IdeaGenerator()
-sheets_client = SheetsClient()
+# External clients are created on first use, see get_idea_generator/get_sheets_client
+_idea_generator = None
+_sheets_client = None
+_idea_generator_lock = threading.Lock()
+_sheets_client_lock = threading.Lock()
+
+
+def get_idea_generator():
+    """Get the process-wide IdeaGenerator, creating it on first use."""
+    global _idea_generator
+    with _idea_generator_lock:
+        if _idea_generator is None:
+            from openai_client import IdeaGenerator
+            _idea_generator = IdeaGenerator()
+        return _idea_generator
+
+
+def get_sheets_client():
+    """Get the process-wide SheetsClient, creating it and checking headers on first use."""
+    global _sheets_client
+    with _sheets_client_lock:
+        if _sheets_client is None:
+            from sheets import SheetsClient
+            client = SheetsClient()
+            # Ensure sheet has headers before anything is appended
+            try:
+                client.ensure_headers()
+            except Exception as e:
+                print(f"Warning: Could not ensure headers: {e}")
+            _sheets_client = client
+        return _sheets_client
+
+
+def warm_clients():
+    """Create the clients in the background so startup does not wait on them."""
+    for getter in (get_sheets_client, get_idea_generator):
+        try:
+            getter()
+        except Exception as e:
+            print(f"Warning: Could not initialize client: {e}")
+
 
-# Ensure sheet has headers
-try:
-    sheets_client.ensure_headers()
-except Exception as e:
-    print(f"Warning: Could not ensure headers: {e}")
+job_manager = JobManager()
+
+# Submissions are journaled locally and flushed to the sheet in batches
+sheets_writer = SheetsWriter(RowJournal(), get_sheets_client)
+sheets_writer.start()
+row_mirror = RowMirror()
+
+threading.Thread(target=warm_clients, name='warm-clients', daemon=True).start()
+
+# Let Bender cache TTS for all quotes so page views play them instantly
+prewarm_bender_audio(get_all_quotes())
 
 
 def admin_required(f):
@@ -58,6 +108,20 @@ def admin_required(f):
     return decorated_function
 
 
+def stream_ideas_job(prompt, publish):
+    """Generate ideas, publishing each one to event listeners as it completes."""
+    ideas = []
+    for idea in get_idea_generator().stream_ideas(prompt):
+        ideas.append(idea)
+        publish(idea)
+    return ideas
+
+
+def improve_idea_job(idea, instruction):
+    """Improve an idea with the user's instruction."""
+    return get_idea_generator().improve_idea(idea, instruction)
+
+
 @app.route('/')
 def landing():
     """Landing page."""
@@ -89,32 +153,60 @@ def brainstorm():
         flash('Будь ласка, введіть промпт для генерації ідей', 'error')
         return redirect(url_for('brainstorm'))
     
-    try:
-        # Generate session ID if not exists
-        if 'session_id' not in session:
-            session['session_id'] = str(uuid.uuid4())
-        
-        # Store prompt in session
-        session['prompt_initial'] = prompt
-        
-        # Generate ideas
-        quote = get_random_quote('brainstorm')
-        play_bender_audio(quote)  # Play audio in background
-        ideas = idea_generator.generate_ideas(prompt)
-        
-        # Store ideas in session
-        session['ideas_generated'] = ideas
-        
+    # Generate session ID if not exists
+    if 'session_id' not in session:
+        session['session_id'] = str(uuid.uuid4())
+    
+    # Store prompt in session
+    session['prompt_initial'] = prompt
+    
+    # Generate ideas in the background, the page shows them as they arrive
+    job = job_manager.submit(session['session_id'], 'brainstorm',
+                             stream_ideas_job, prompt,
+                             dedupe_key=prompt, progress=True)
+    
+    quote = get_random_quote('brainstorm')
+    play_bender_audio(quote)  # Play audio in background
+    return render_template('brainstorm.html',
+                         default_prompt=prompt,
+                         quote=quote,
+                         stage=1,
+                         job_id=job.id,
+                         events_url=url_for('job_events', job_id=job.id),
+                         result_url=url_for('brainstorm_result', job_id=job.id))
+
+
+@app.route('/brainstorm/result/<job_id>')
+def brainstorm_result(job_id):
+    """Show ideas generated by a finished brainstorm job."""
+    job = job_manager.get(job_id, session.get('session_id', ''))
+    if job is None or job.kind != 'brainstorm':
+        flash('Результат не знайдено. Спробуйте ще раз.', 'error')
+        return redirect(url_for('brainstorm'))
+    
+    if job.active:
         return render_template('brainstorm.html',
-                             prompt=prompt,
-                             ideas=ideas,
-                             quote=quote,
+                             default_prompt=session.get('prompt_initial', ''),
                              stage=1,
-                             generated=True)
+                             job_id=job.id,
+                             events_url=url_for('job_events', job_id=job.id),
+                             result_url=url_for('brainstorm_result', job_id=job.id))
     
-    except Exception as e:
-        flash(f'Помилка при генерації ідей. Спробуйте ще раз. ({str(e)})', 'error')
+    if job.status == 'failed':
+        flash(f'Помилка при генерації ідей. Спробуйте ще раз. ({job.error})', 'error')
         return redirect(url_for('brainstorm'))
+    
+    ideas = job.result
+    
+    # Store ideas in session
+    session['ideas_generated'] = ideas
+    
+    return render_template('brainstorm.html',
+                         prompt=session.get('prompt_initial', ''),
+                         ideas=ideas,
+                         quote=get_random_quote('brainstorm'),
+                         stage=1,
+                         generated=True)
 
 
 @app.route('/improve', methods=['POST'])
@@ -163,24 +255,97 @@ def improve():
         # Store edit notes
         session['user_edit_notes'] = instruction
         
-        # Improve the idea
-        improved = idea_generator.improve_idea(selected_idea, instruction)
-        session['selected_idea'] = improved
+        # Improve the idea in the background, the page polls for the result
+        if 'session_id' not in session:
+            session['session_id'] = str(uuid.uuid4())
+        job = job_manager.submit(session['session_id'], 'improve',
+                                 improve_idea_job, selected_idea, instruction,
+                                 dedupe_key=(json.dumps(selected_idea, sort_keys=True), instruction))
         
         quote = get_random_quote('improve')
         play_bender_audio(quote)  # Play audio in background
         return render_template('improve.html',
-                             idea=improved,
+                             idea=selected_idea,
                              quote=quote,
                              stage=2,
-                             improved=True,
-                             changes=improved.get('changes_summary', ''))
+                             job_id=job.id,
+                             result_url=url_for('improve_result', job_id=job.id))
     
     except Exception as e:
         flash(f'Помилка при покращенні ідеї. Спробуйте ще раз. ({str(e)})', 'error')
         return redirect(url_for('brainstorm'))
 
 
+@app.route('/improve/result/<job_id>')
+def improve_result(job_id):
+    """Show the idea improved by a finished improve job."""
+    job = job_manager.get(job_id, session.get('session_id', ''))
+    if job is None or job.kind != 'improve':
+        flash('Результат не знайдено. Спробуйте ще раз.', 'error')
+        return redirect(url_for('brainstorm'))
+    
+    if job.active:
+        return render_template('improve.html',
+                             idea=session.get('selected_idea', {}),
+                             stage=2,
+                             job_id=job.id,
+                             result_url=url_for('improve_result', job_id=job.id))
+    
+    if job.status == 'failed':
+        flash(f'Помилка при покращенні ідеї. Спробуйте ще раз. ({job.error})', 'error')
+        return render_template('improve.html',
+                             idea=session.get('selected_idea', {}),
+                             stage=2)
+    
+    improved = job.result
+    session['selected_idea'] = improved
+    
+    return render_template('improve.html',
+                         idea=improved,
+                         quote=get_random_quote('improve'),
+                         stage=2,
+                         improved=True,
+                         changes=improved.get('changes_summary', ''))
+
+
+@app.route('/jobs/<job_id>')
+@limiter.exempt
+def job_status(job_id):
+    """Polling endpoint for background job status."""
+    job = job_manager.get(job_id, session.get('session_id', ''))
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/events')
+@limiter.exempt
+def job_events(job_id):
+    """Server-Sent Events stream of a job's partial results, then its final status."""
+    job = job_manager.get(job_id, session.get('session_id', ''))
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def events():
+        nonlocal job
+        seen = 0
+        while True:
+            new_events, active, job = job_manager.wait_for_events(job, seen, timeout=15)
+            for event in new_events:
+                yield f"event: progress\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            seen += len(new_events)
+            if not active:
+                break
+            if not new_events:
+                yield ": keep-alive\n\n"
+        yield f"event: done\ndata: {json.dumps(job.to_dict())}\n\n"
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
 @app.route('/submit', methods=['GET', 'POST'])
 def submit():
     """Submit final idea."""
@@ -229,12 +394,9 @@ def submit():
             ip_address
         ]
         
-        # Append to Google Sheets
-        success = sheets_client.append_row(row)
-        
-        if not success:
-            flash('Помилка при збереженні. Спробуйте ще раз.', 'error')
-            return redirect(url_for('submit'))
+        # Journal locally, the background writer appends it to Google Sheets
+        row_id = sheets_writer.submit(row)
+        row_mirror.record(row_id, row)
         
         # Store final data for thank you page
         session['final_title'] = final_title
@@ -272,12 +434,33 @@ def thankyou():
 def admin():
     """Admin dashboard to view recent ideas."""
     try:
-        rows = sheets_client.read_recent_rows(limit=50)
-        if rows is None:
-            flash('Помилка при читанні даних', 'error')
-            rows = []
+        # Pick up rows added to the sheet elsewhere, reading only past the watermark
+        try:
+            row_mirror.sync_if_stale(get_sheets_client())
+        except Exception as e:
+            print(f"Error syncing rows from sheet: {e}")
+            flash('Не вдалося синхронізувати з таблицею, показано локальні дані', 'error')
+        
+        page = request.args.get('page', 1, type=int)
+        session_filter = request.args.get('session_id', '').strip()
+        date_filter = request.args.get('date', '').strip()
+        per_page = 50
+        
+        try:
+            rows, total = row_mirror.query(page, per_page, session_filter, date_filter)
+        except ValueError:
+            flash('Невірний формат дати', 'error')
+            date_filter = ''
+            rows, total = row_mirror.query(page, per_page, session_filter)
         
-        return render_template('admin.html', rows=rows)
+        return render_template('admin.html',
+                             rows=rows,
+                             total=total,
+                             stats=row_mirror.stats(),
+                             page=page,
+                             pages=max(1, (total + per_page - 1) // per_page),
+                             session_filter=session_filter,
+                             date_filter=date_filter)
     
     except Exception as e:
         return f"Error loading admin page: {e}", 500
@@ -0,0 +1,70 @@
+"""Cold-start benchmark for the Flask app.
+
+Each run starts a fresh interpreter, the way a new gunicorn worker does, and
+measures importing the app, serving the first request and creating the
+external clients. Uses the in-memory Sheets fake unless --real-sheets is given.
+
+    python bench_startup.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = r'''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/')
+first_request = time.perf_counter()
+app.get_sheets_client()
+sheets_ready = time.perf_counter()
+app.get_idea_generator()
+generator_ready = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'first_request': first_request - imported,
+    'sheets_client': sheets_ready - first_request,
+    'idea_generator': generator_ready - sheets_ready,
+    'status': response.status_code,
+}))
+'''
+
+
+def run_once(env):
+    """Run the probe in a fresh interpreter and return its timings."""
+    output = subprocess.run([sys.executable, '-c', PROBE], env=env, check=True,
+                            capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure idea_factory cold start")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--real-sheets', action='store_true', help="use GOOGLE_SHEETS_CREDS instead of the fake")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='idea-bench-')
+    env = dict(os.environ)
+    env.setdefault('OPENAI_API_KEY', 'bench')
+    env.setdefault('BENDER_URL', 'http://127.0.0.1:9')
+    env['JOURNAL_PATH'] = os.path.join(workdir, 'submissions.sqlite3')
+    env['IDEA_CACHE_PATH'] = os.path.join(workdir, 'idea_cache.sqlite3')
+    if not args.real_sheets:
+        env['GOOGLE_SHEETS_FAKE'] = '1'
+
+    results = [run_once(env) for _ in range(args.runs)]
+    print(f"{args.runs} cold starts ({'real' if args.real_sheets else 'fake'} Sheets)")
+    for name in ('import', 'first_request', 'sheets_client', 'idea_generator'):
+        timings = [result[name] * 1000 for result in results]
+        print(f"{name:<16} median {statistics.median(timings):8.1f} ms   max {max(timings):8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
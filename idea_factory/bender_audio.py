@@ -1,30 +1,169 @@
-"""Helper function to trigger Bender audio playback."""
+"""Helper functions to trigger Bender audio playback without blocking page renders."""
 
 import os
+import queue
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
+
+
+class BenderAudioDispatcher:
+    """Background sender for Bender audio requests.
+
+    Requests go into a bounded in-process queue and are posted by a single
+    worker thread over a pooled session, so callers never wait on the robot.
+    After several consecutive failures the circuit opens and requests are
+    dropped until an exponential backoff expires.
+    """
+
+    def __init__(self, base_url: str, maxsize: int = 20, timeout: float = 2.0,
+                 failure_threshold: int = 3, base_backoff: float = 5.0, max_backoff: float = 60.0):
+        """
+        Initialize the dispatcher.
+
+        Args:
+            base_url: Bender app URL, e.g. http://bender.rmn.pp.ua
+            maxsize: Maximum number of requests waiting to be sent
+            timeout: Default HTTP timeout in seconds
+            failure_threshold: Consecutive failures before the circuit opens
+            base_backoff: First circuit-open period in seconds, doubled on each further failure
+            max_backoff: Upper bound for the circuit-open period in seconds
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.lock = threading.Lock()
+        self.counters = {'sent': 0, 'dropped': 0, 'failed': 0}
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+        self.worker = threading.Thread(target=self._run, name='bender-audio', daemon=True)
+        self.worker.start()
+
+    def submit(self, path: str, payload: Dict, timeout: Optional[float] = None) -> bool:
+        """
+        Queue a POST to the Bender app.
+
+        Args:
+            path: Endpoint path, e.g. /audio/play
+            payload: JSON body
+            timeout: HTTP timeout for this request (defaults to the dispatcher's)
+
+        Returns:
+            True if the request was queued, False if it was dropped
+        """
+        if self.circuit_open():
+            self._count('dropped')
+            return False
+
+        item = (path, payload, timeout or self.timeout)
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return True
+            except queue.Full:
+                # Drop the oldest request, fresh quotes matter more
+                try:
+                    self.queue.get_nowait()
+                    self._count('dropped')
+                except queue.Empty:
+                    pass
+
+    def circuit_open(self) -> bool:
+        """Whether requests are currently being skipped because Bender is down."""
+        return time.monotonic() < self.open_until
+
+    def stats(self) -> Dict[str, int]:
+        """Get sent/dropped/failed counters and the current queue length."""
+        with self.lock:
+            stats = dict(self.counters)
+        stats['queued'] = self.queue.qsize()
+        stats['circuit_open'] = self.circuit_open()
+        return stats
+
+    def _count(self, name: str) -> None:
+        with self.lock:
+            self.counters[name] += 1
+
+    def _run(self) -> None:
+        while True:
+            path, payload, timeout = self.queue.get()
+            if self.circuit_open():
+                self._count('dropped')
+                continue
+
+            try:
+                response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=timeout)
+                response.raise_for_status()
+            except Exception as e:
+                self._count('failed')
+                self._record_failure()
+                print(f"Failed to send Bender audio request: {e}")
+                continue
+
+            self._count('sent')
+            self.consecutive_failures = 0
+
+    def _record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            exponent = self.consecutive_failures - self.failure_threshold
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** exponent)
+            self.open_until = time.monotonic() + backoff * random.uniform(0.5, 1.0)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> BenderAudioDispatcher:
+    """Get the process-wide dispatcher, starting it on first use."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            bender_url = os.getenv('BENDER_URL', 'http://bender.rmn.pp.ua')
+            _dispatcher = BenderAudioDispatcher(bender_url)
+        return _dispatcher
 
 
 def play_bender_audio(text: str) -> bool:
     """
-    Send text to Bender app for TTS playback.
-    
+    Send text to Bender app for TTS playback in the background.
+
     Args:
         text: Text to convert to speech and play
-    
+
+    Returns:
+        True if the request was queued, False if it was dropped
+    """
+    return get_dispatcher().submit('/audio/play', {"text": text})
+
+
+def prewarm_bender_audio(texts: List[str]) -> bool:
+    """
+    Ask Bender to cache TTS for known phrases, without blocking the caller.
+
+    Args:
+        texts: Phrases that will be played later via play_bender_audio
+
     Returns:
-        True if successful, False otherwise
+        True if the request was queued, False if it was dropped
     """
-    bender_url = os.getenv('BENDER_URL', 'http://bender.rmn.pp.ua')
-    endpoint = f"{bender_url}/audio/play"
-    
-    try:
-        response = requests.post(
-            endpoint,
-            json={"text": text},
-            timeout=2  # Don't wait too long, this is non-blocking
-        )
-        return response.status_code == 200
-    except Exception as e:
-        # Silently fail - audio is optional
-        print(f"Failed to play Bender audio: {e}")
-        return False
+    return get_dispatcher().submit('/audio/prewarm', {"texts": texts}, timeout=10)
+
+
+def get_bender_audio_stats() -> Dict[str, int]:
+    """Get counters of sent, dropped and failed Bender audio requests."""
+    return get_dispatcher().stats()
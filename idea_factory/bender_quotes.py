@@ -1,6 +1,7 @@
 """Bender-style motivational quotes in Ukrainian for different stages."""
 
 import random
+from typing import List
 
 LANDING_QUOTES = [
     "Давайте вже нарешті щось придумаємо!",
@@ -38,14 +39,21 @@ THANKYOU_QUOTES = [
 ]
 
 
+QUOTES_BY_STAGE = {
+    'landing': LANDING_QUOTES,
+    'brainstorm': BRAINSTORM_QUOTES,
+    'improve': IMPROVE_QUOTES,
+    'submit': SUBMIT_QUOTES,
+    'thankyou': THANKYOU_QUOTES,
+}
+
+
 def get_random_quote(stage: str) -> str:
     """Get a random Bender quote for the given stage."""
-    quotes_map = {
-        'landing': LANDING_QUOTES,
-        'brainstorm': BRAINSTORM_QUOTES,
-        'improve': IMPROVE_QUOTES,
-        'submit': SUBMIT_QUOTES,
-        'thankyou': THANKYOU_QUOTES,
-    }
-    quotes = quotes_map.get(stage, LANDING_QUOTES)
+    quotes = QUOTES_BY_STAGE.get(stage, LANDING_QUOTES)
     return random.choice(quotes)
+
+
+def get_all_quotes() -> List[str]:
+    """Get every quote, e.g. to pre-warm Bender's TTS cache."""
+    return [quote for quotes in QUOTES_BY_STAGE.values() for quote in quotes]
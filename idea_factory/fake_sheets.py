@@ -0,0 +1,108 @@
+"""In-memory stand-in for the Google Sheets API, for local runs and tests."""
+
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+RANGE_PATTERN = re.compile(r'^(?:[^!]+!)?([A-Z]+)(\d*)(?::([A-Z]+)(\d*))?$')
+
+
+def _column_index(letters: str) -> int:
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def _parse_range(range_name: str) -> Tuple[int, int, int, Optional[int]]:
+    """Parse an A1 range into (first_col, last_col, first_row, last_row), zero-based and inclusive."""
+    match = RANGE_PATTERN.match(range_name)
+    if not match:
+        raise ValueError(f"Unsupported range: {range_name}")
+    start_col, start_row, end_col, end_row = match.groups()
+    first_row = int(start_row) - 1 if start_row else 0
+    if end_col is None:
+        last_row = first_row if start_row else None
+        end_col = start_col
+    else:
+        last_row = int(end_row) - 1 if end_row else None
+    return _column_index(start_col), _column_index(end_col), first_row, last_row
+
+
+class _Request:
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+
+    def execute(self) -> Dict[str, Any]:
+        return self.fn(*self.args)
+
+
+class FakeSheetsService:
+    """Implements spreadsheets().values().append/get/update on an in-memory grid.
+
+    Set fail_next to make the next N execute() calls raise, and
+    fail_after_write to make an append land but still raise, like a
+    request that times out after the server applied it.
+    """
+
+    def __init__(self):
+        self.rows: List[List[str]] = []
+        self.lock = threading.Lock()
+        self.fail_next = 0
+        self.fail_after_write = False
+        self.append_calls = 0
+
+    def spreadsheets(self) -> 'FakeSheetsService':
+        return self
+
+    def values(self) -> 'FakeSheetsService':
+        return self
+
+    def append(self, spreadsheetId: str, range: str, body: Dict[str, Any], **kwargs) -> _Request:
+        return _Request(self._append, body['values'])
+
+    def get(self, spreadsheetId: str, range: str, **kwargs) -> _Request:
+        return _Request(self._get, range)
+
+    def update(self, spreadsheetId: str, range: str, body: Dict[str, Any], **kwargs) -> _Request:
+        return _Request(self._update, range, body['values'])
+
+    def _check_failure(self) -> None:
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            raise RuntimeError("Simulated Sheets API failure")
+
+    def _append(self, values: List[List[str]]) -> Dict[str, Any]:
+        with self.lock:
+            self._check_failure()
+            self.append_calls += 1
+            self.rows.extend([str(value) for value in row] for row in values)
+            if self.fail_after_write:
+                self.fail_after_write = False
+                raise RuntimeError("Simulated timeout after append")
+        return {'updates': {'updatedRows': len(values)}}
+
+    def _get(self, range_name: str) -> Dict[str, Any]:
+        first_col, last_col, first_row, last_row = _parse_range(range_name)
+        with self.lock:
+            self._check_failure()
+            rows = self.rows[first_row:None if last_row is None else last_row + 1]
+            values = [row[first_col:last_col + 1] for row in rows]
+        # Like the real API, trailing empty rows are omitted
+        while values and not values[-1]:
+            values.pop()
+        return {'values': values} if values else {}
+
+    def _update(self, range_name: str, values: List[List[str]]) -> Dict[str, Any]:
+        first_col, _, first_row, _ = _parse_range(range_name)
+        with self.lock:
+            self._check_failure()
+            for offset, row in enumerate(values):
+                index = first_row + offset
+                while len(self.rows) <= index:
+                    self.rows.append([])
+                target = self.rows[index]
+                target.extend([''] * (first_col + len(row) - len(target)))
+                target[first_col:first_col + len(row)] = [str(value) for value in row]
+        return {'updatedRows': len(values)}
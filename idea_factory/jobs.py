@@ -0,0 +1,210 @@
+"""Background jobs for slow OpenAI calls, so HTTP workers return immediately.
+
+A job runs on a thread of the worker that received the request, but its
+status, partial results and final result live in the shared store
+(see store.py), so any worker can answer polls and event streams for it.
+"""
+
+import hashlib
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from store import open_store
+
+
+class Job:
+    """A unit of background work owned by one user session.
+
+    Instances returned by JobManager.get are snapshots of the stored job;
+    call JobManager.get again for fresh state.
+    """
+
+    def __init__(self, owner: str, kind: str, job_id: Optional[str] = None):
+        """
+        Initialize a pending job.
+
+        Args:
+            owner: Session ID of the user who started the job
+            kind: Job type, e.g. 'brainstorm' or 'improve'
+            job_id: ID of an existing job being loaded from the store
+        """
+        self.id = job_id or uuid.uuid4().hex
+        self.owner = owner
+        self.kind = kind
+        self.status = 'pending'  # pending -> running -> done / failed
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.events: List[Any] = []
+
+    @property
+    def active(self) -> bool:
+        """Whether the job has not finished yet."""
+        return self.status in ('pending', 'running')
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public view of the job for the polling endpoint."""
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'error': self.error,
+        }
+
+    def dumps(self) -> str:
+        """Serialize the full job state for the store."""
+        return json.dumps({
+            'id': self.id,
+            'owner': self.owner,
+            'kind': self.kind,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created': self.created,
+            'finished': self.finished,
+            'events': self.events,
+        }, ensure_ascii=False)
+
+    @classmethod
+    def loads(cls, data: bytes) -> 'Job':
+        """Rebuild a job from its stored state."""
+        state = json.loads(data)
+        job = cls(state['owner'], state['kind'], state['id'])
+        job.status = state['status']
+        job.result = state['result']
+        job.error = state['error']
+        job.created = state['created']
+        job.finished = state['finished']
+        job.events = state['events']
+        return job
+
+
+class JobManager:
+    """Runs jobs on a thread pool and keeps their state in the shared store."""
+
+    def __init__(self, max_workers: Optional[int] = None, ttl: int = 3600, store=None,
+                 key_prefix: str = 'job:', poll_interval: float = 0.25):
+        """
+        Initialize the job manager.
+
+        Args:
+            max_workers: Number of worker threads (defaults to JOB_WORKERS or 8)
+            ttl: Seconds to keep a job after it was last updated
+            store: SQLiteStore or redis client (defaults to open_store())
+            key_prefix: Prefix of the store keys
+            poll_interval: Seconds between store reads while waiting for events
+        """
+        max_workers = max_workers or int(os.getenv('JOB_WORKERS', '8'))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.ttl = ttl
+        self.store = store or open_store()
+        self.key_prefix = key_prefix
+        self.poll_interval = poll_interval
+
+    def submit(self, owner: str, kind: str, fn: Callable[..., Any], *args,
+               dedupe_key: Hashable = None, progress: bool = False) -> Job:
+        """
+        Start fn(*args) in the background.
+
+        While a job with the same owner, kind and dedupe_key is still running,
+        the existing job is returned instead, so a double-clicked submit does
+        not launch a second generation, even when it reaches another worker.
+
+        Args:
+            owner: Session ID of the user
+            kind: Job type
+            fn: Function to run
+            *args: Arguments for fn
+            dedupe_key: Value identifying identical requests, e.g. the prompt
+            progress: Pass a publish(event) function to fn as the `publish` keyword
+
+        Returns:
+            The new or already running job
+        """
+        digest = hashlib.sha256(repr((owner, kind, dedupe_key)).encode('utf-8')).hexdigest()
+        active_key = f'{self.key_prefix}active:{digest}'
+        job = Job(owner, kind)
+        while not self.store.set(active_key, job.id, ex=self.ttl, nx=True):
+            existing_id = self.store.get(active_key)
+            existing = self._load(existing_id.decode('utf-8')) if existing_id else None
+            if existing is not None and existing.active:
+                return existing
+            # The claim belongs to a finished or forgotten job
+            self.store.delete(active_key)
+
+        self._save(job)
+        kwargs = {'publish': lambda event: self._publish(job, event)} if progress else {}
+        self.executor.submit(self._run, job, active_key, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str, owner: str) -> Optional[Job]:
+        """
+        Look up a job belonging to the given session.
+
+        Args:
+            job_id: Job ID returned by submit
+            owner: Session ID of the user asking
+
+        Returns:
+            The job, or None if it is unknown or belongs to someone else
+        """
+        job = self._load(job_id)
+        if job is None or job.owner != owner:
+            return None
+        return job
+
+    def wait_for_events(self, job: Job, after: int, timeout: float) -> Tuple[List[Any], bool, Job]:
+        """
+        Wait until the job has events past index `after` or finishes.
+
+        Args:
+            job: Job returned by get
+            after: Number of events the caller has already seen
+            timeout: Maximum seconds to wait
+
+        Returns:
+            New events, whether the job is still active, and the latest job state
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self._load(job.id) or job
+            if len(job.events) > after or not job.active or time.monotonic() >= deadline:
+                return job.events[after:], job.active, job
+            time.sleep(self.poll_interval)
+
+    def _key(self, job_id: str) -> str:
+        return f'{self.key_prefix}{job_id}'
+
+    def _load(self, job_id: str) -> Optional[Job]:
+        data = self.store.get(self._key(job_id))
+        return Job.loads(data) if data else None
+
+    def _save(self, job: Job) -> None:
+        # Only the worker running the job writes it, so there are no conflicting updates
+        self.store.set(self._key(job.id), job.dumps(), ex=self.ttl)
+
+    def _publish(self, job: Job, event: Any) -> None:
+        job.events.append(event)
+        self._save(job)
+
+    def _run(self, job: Job, active_key: str, fn: Callable[..., Any], args: tuple,
+             kwargs: Dict[str, Any]) -> None:
+        job.status = 'running'
+        self._save(job)
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = 'done'
+        except Exception as e:
+            print(f"Job {job.kind} failed: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished = time.time()
+            self._save(job)
+            if self.store.get(active_key) == job.id.encode('utf-8'):
+                self.store.delete(active_key)
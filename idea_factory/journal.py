@@ -0,0 +1,223 @@
+"""Durable local journal of submitted rows, flushed to Google Sheets in batches."""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+
+class RowJournal:
+    """Append-only SQLite journal of rows waiting to be written to the sheet.
+
+    Every row gets a unique row_id that is also written to the sheet, so a
+    batch whose outcome is unknown can be checked and never appended twice.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the journal.
+
+        Args:
+            path: SQLite file (defaults to JOURNAL_PATH or instance/submissions.sqlite3)
+        """
+        self.path = path or os.getenv('JOURNAL_PATH', os.path.join('instance', 'submissions.sqlite3'))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS journal ('
+                'seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'row_id TEXT UNIQUE NOT NULL, '
+                'row_values TEXT NOT NULL, '
+                'created REAL NOT NULL, '
+                'sent_at REAL, '
+                'attempts INTEGER NOT NULL DEFAULT 0, '
+                'claimed_until REAL NOT NULL DEFAULT 0)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS journal_pending ON journal (sent_at, seq)')
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def append(self, row_values: List[str]) -> str:
+        """
+        Durably record a row for writing to the sheet.
+
+        Args:
+            row_values: Row values in sheet column order
+
+        Returns:
+            The row_id assigned to the row
+        """
+        row_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO journal (row_id, row_values, created) VALUES (?, ?, ?)',
+                (row_id, json.dumps(row_values, ensure_ascii=False), time.time())
+            )
+        return row_id
+
+    def claim_pending(self, limit: int = 100, lease: float = 60.0) -> List[Tuple[str, List[str], bool]]:
+        """
+        Claim unsent rows for flushing, so other processes skip them for `lease` seconds.
+
+        Args:
+            limit: Maximum number of rows to claim
+            lease: Seconds before an unfinished claim can be taken over
+
+        Returns:
+            List of (row_id, row_values, uncertain) in submission order, where
+            uncertain means an earlier attempt failed or was abandoned and the
+            row may already be in the sheet
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(
+                'SELECT row_id, row_values, attempts, claimed_until FROM journal '
+                'WHERE sent_at IS NULL AND claimed_until < ? ORDER BY seq LIMIT ?',
+                (now, limit)
+            ).fetchall()
+            conn.executemany(
+                'UPDATE journal SET claimed_until = ? WHERE row_id = ?',
+                [(now + lease, row[0]) for row in rows]
+            )
+            conn.execute('COMMIT')
+        return [(row_id, json.loads(values), bool(attempts or claimed_until))
+                for row_id, values, attempts, claimed_until in rows]
+
+    def mark_sent(self, row_ids: List[str]) -> None:
+        """Mark rows as written to the sheet."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                'UPDATE journal SET sent_at = ?, claimed_until = 0 WHERE row_id = ?',
+                [(now, row_id) for row_id in row_ids]
+            )
+
+    def release(self, row_ids: List[str]) -> None:
+        """Return claimed rows to the pending pool after a failed attempt."""
+        with self._connect() as conn:
+            conn.executemany(
+                'UPDATE journal SET attempts = attempts + 1, claimed_until = 0 WHERE row_id = ?',
+                [(row_id,) for row_id in row_ids]
+            )
+
+    def pending_count(self) -> int:
+        """Number of rows not yet written to the sheet."""
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM journal WHERE sent_at IS NULL').fetchone()[0]
+
+
+class SheetsWriter:
+    """Background flusher that appends journaled rows to the sheet in batches.
+
+    Rows are appended with a single multi-row request. After a failed
+    append the sheet's row_id column is checked before retrying, because
+    the append may have landed even though the request errored.
+    """
+
+    def __init__(self, journal: RowJournal, get_client: Callable[[], Any], batch_size: int = 100,
+                 batch_window: float = 1.0, max_backoff: float = 60.0):
+        """
+        Initialize the writer.
+
+        Args:
+            journal: Journal to read pending rows from
+            get_client: Returns the SheetsClient (or anything with append_rows/read_row_ids),
+                called from the writer thread so the client can be created lazily
+            batch_size: Maximum rows per append request
+            batch_window: Seconds to wait after a new row so a rush is sent as one batch
+            max_backoff: Upper bound for the retry delay in seconds
+        """
+        self.journal = journal
+        self.get_client = get_client
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_backoff = max_backoff
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self) -> None:
+        """Start the flusher thread."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='sheets-writer', daemon=True)
+            self.thread.start()
+
+    def submit(self, row_values: List[str]) -> str:
+        """
+        Journal a row and wake the flusher.
+
+        Args:
+            row_values: Row values in sheet column order (without row_id)
+
+        Returns:
+            The row_id assigned to the row
+        """
+        row_id = self.journal.append(row_values)
+        self.wakeup.set()
+        return row_id
+
+    def flush(self) -> int:
+        """
+        Write one batch of pending rows to the sheet.
+
+        Returns:
+            Number of rows confirmed in the sheet
+
+        Raises:
+            Exception: If the sheet could not be updated
+        """
+        batch = self.journal.claim_pending(self.batch_size)
+        if not batch:
+            return 0
+
+        row_ids = [row_id for row_id, _, _ in batch]
+        try:
+            sheets_client = self.get_client()
+            if any(uncertain for _, _, uncertain in batch):
+                # A previous attempt may have reached the sheet, don't append those again
+                landed = sheets_client.read_row_ids() & set(row_ids)
+                if landed:
+                    self.journal.mark_sent(list(landed))
+                batch = [item for item in batch if item[0] not in landed]
+
+            if batch:
+                sheets_client.append_rows([values + [row_id] for row_id, values, _ in batch])
+                self.journal.mark_sent([row_id for row_id, _, _ in batch])
+        except Exception:
+            self.journal.release([row_id for row_id, _, _ in batch])
+            raise
+        return len(row_ids)
+
+    def _run(self) -> None:
+        failures = 0
+        while True:
+            self.wakeup.wait(timeout=30)
+            if self.wakeup.is_set():
+                # Give a rush of submissions a moment to pile up into one batch
+                time.sleep(self.batch_window)
+                self.wakeup.clear()
+
+            try:
+                while self.flush() == self.batch_size:
+                    pass
+                failures = 0
+            except Exception as e:
+                failures += 1
+                delay = min(self.max_backoff, 2 ** failures) * random.uniform(0.5, 1.0)
+                print(f"Error flushing rows to sheet (retry in {delay:.0f}s): {e}")
+                time.sleep(delay)
+                self.wakeup.set()
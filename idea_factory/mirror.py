@@ -0,0 +1,183 @@
+"""Local SQLite mirror of the Ideas sheet, so the admin page never reads the whole sheet."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class RowMirror:
+    """Indexed copy of submitted rows.
+
+    Rows are recorded on the write path as they are submitted, and rows
+    that reach the sheet some other way are picked up by an incremental
+    sync that only reads past the last sheet row seen (the watermark).
+    Rows are keyed by their row_id, so both sources merge without
+    duplicates.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the mirror.
+
+        Args:
+            path: SQLite file (defaults to JOURNAL_PATH or instance/submissions.sqlite3)
+        """
+        self.path = path or os.getenv('JOURNAL_PATH', os.path.join('instance', 'submissions.sqlite3'))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.sync_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS mirror ('
+                'row_key TEXT PRIMARY KEY, '
+                'sheet_row INTEGER, '
+                'timestamp_utc TEXT NOT NULL, '
+                'session_id TEXT NOT NULL, '
+                'row_values TEXT NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS mirror_timestamp ON mirror (timestamp_utc)')
+            conn.execute('CREATE INDEX IF NOT EXISTS mirror_session ON mirror (session_id, timestamp_utc)')
+            conn.execute('CREATE TABLE IF NOT EXISTS mirror_meta (name TEXT PRIMARY KEY, value REAL NOT NULL)')
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _get_meta(self, conn: sqlite3.Connection, name: str, default: float) -> float:
+        row = conn.execute('SELECT value FROM mirror_meta WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, conn: sqlite3.Connection, name: str, value: float) -> None:
+        conn.execute(
+            'INSERT INTO mirror_meta (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = excluded.value',
+            (name, value)
+        )
+
+    def record(self, row_id: str, row_values: List[str]) -> None:
+        """
+        Add a row from the write path.
+
+        Args:
+            row_id: Row ID assigned by the journal
+            row_values: Row values in sheet column order (without row_id)
+        """
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR IGNORE INTO mirror (row_key, timestamp_utc, session_id, row_values) '
+                'VALUES (?, ?, ?, ?)',
+                (row_id, row_values[0], row_values[1], json.dumps(row_values, ensure_ascii=False))
+            )
+
+    def sync(self, sheets_client) -> int:
+        """
+        Pull rows appended to the sheet since the last sync.
+
+        Args:
+            sheets_client: SheetsClient to read from
+
+        Returns:
+            Number of sheet rows read
+        """
+        with self.sync_lock:
+            with self._connect() as conn:
+                watermark = int(self._get_meta(conn, 'watermark', 1))  # Row 1 is the header
+
+            rows = sheets_client.read_rows_from(watermark + 1)
+
+            with self._connect() as conn:
+                conn.execute('BEGIN')
+                for offset, row in enumerate(rows):
+                    if len(row) < 2:
+                        continue
+                    sheet_row = watermark + 1 + offset
+                    row_key = row[10] if len(row) > 10 and row[10] else f'sheet:{sheet_row}'
+                    values = row[:10]
+                    conn.execute(
+                        'INSERT INTO mirror (row_key, sheet_row, timestamp_utc, session_id, row_values) '
+                        'VALUES (?, ?, ?, ?, ?) '
+                        'ON CONFLICT(row_key) DO UPDATE SET sheet_row = excluded.sheet_row',
+                        (row_key, sheet_row, values[0], values[1], json.dumps(values, ensure_ascii=False))
+                    )
+                self._set_meta(conn, 'watermark', watermark + len(rows))
+                self._set_meta(conn, 'synced_at', time.time())
+                conn.execute('COMMIT')
+            return len(rows)
+
+    def sync_if_stale(self, sheets_client, max_age: float = 60.0) -> bool:
+        """
+        Sync unless the last sync was less than max_age seconds ago.
+
+        Args:
+            sheets_client: SheetsClient to read from
+            max_age: Seconds a sync stays fresh
+
+        Returns:
+            True if a sync ran
+        """
+        with self._connect() as conn:
+            synced_at = self._get_meta(conn, 'synced_at', 0)
+        if time.time() - synced_at < max_age:
+            return False
+        self.sync(sheets_client)
+        return True
+
+    def query(self, page: int = 1, per_page: int = 50, session_id: str = '',
+              date: str = '') -> Tuple[List[List[str]], int]:
+        """
+        Get one page of rows, newest first.
+
+        Args:
+            page: Page number starting at 1
+            per_page: Rows per page
+            session_id: Only rows whose session ID starts with this
+            date: Only rows from this UTC day (YYYY-MM-DD)
+
+        Returns:
+            The page of rows and the total number of matching rows
+
+        Raises:
+            ValueError: If date is not in YYYY-MM-DD format
+        """
+        where = []
+        params: List[Any] = []
+        if session_id:
+            escaped = session_id.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            where.append("session_id LIKE ? ESCAPE '\\'")
+            params.append(escaped + '%')
+        if date:
+            day = datetime.strptime(date, '%Y-%m-%d')
+            where.append('timestamp_utc >= ? AND timestamp_utc < ?')
+            params += [day.isoformat(), (day + timedelta(days=1)).isoformat()]
+        clause = f"WHERE {' AND '.join(where)}" if where else ''
+
+        with self._connect() as conn:
+            total = conn.execute(f'SELECT COUNT(*) FROM mirror {clause}', params).fetchone()[0]
+            rows = conn.execute(
+                f'SELECT row_values FROM mirror {clause} ORDER BY timestamp_utc DESC LIMIT ? OFFSET ?',
+                params + [per_page, (max(page, 1) - 1) * per_page]
+            ).fetchall()
+        return [json.loads(values) for values, in rows], total
+
+    def stats(self) -> Dict[str, int]:
+        """Get the total, last-24-hours and unique-session counts."""
+        since = (datetime.utcnow() - timedelta(hours=24)).isoformat()
+        with self._connect() as conn:
+            total, sessions = conn.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT session_id) FROM mirror'
+            ).fetchone()
+            recent = conn.execute(
+                'SELECT COUNT(*) FROM mirror WHERE timestamp_utc >= ?', (since,)
+            ).fetchone()[0]
+        return {'total': total, 'last_24h': recent, 'sessions': sessions}
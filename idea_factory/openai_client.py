@@ -1,12 +1,270 @@
 """OpenAI client for generating and improving ideas."""
 
+import hashlib
 import json
 import os
-from typing import Dict, List
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
+import httpx
 from openai import OpenAI
 
 
+class ResponseCache:
+    """SQLite-backed cache of parsed model responses.
+
+    Entries are keyed on the normalized prompt, model and system prompt and
+    expire after a TTL. When more than max_entries are stored the least
+    recently used ones are evicted. With refresh_in_background enabled an
+    expired entry is still served and a fresh one is generated in a
+    background thread.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[int] = None,
+                 max_entries: Optional[int] = None, refresh_in_background: Optional[bool] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite file (defaults to IDEA_CACHE_PATH or instance/idea_cache.sqlite3)
+            ttl: Seconds an entry stays fresh, 0 disables the cache (IDEA_CACHE_TTL, default 1 day)
+            max_entries: Maximum number of stored responses (IDEA_CACHE_MAX_ENTRIES, default 500)
+            refresh_in_background: Serve expired entries and refresh them in the background
+                (IDEA_CACHE_REFRESH_IN_BACKGROUND=1)
+        """
+        self.path = path or os.getenv('IDEA_CACHE_PATH', os.path.join('instance', 'idea_cache.sqlite3'))
+        self.ttl = ttl if ttl is not None else int(os.getenv('IDEA_CACHE_TTL', '86400'))
+        self.max_entries = max_entries or int(os.getenv('IDEA_CACHE_MAX_ENTRIES', '500'))
+        if refresh_in_background is None:
+            refresh_in_background = os.getenv('IDEA_CACHE_REFRESH_IN_BACKGROUND') == '1'
+        self.refresh_in_background = refresh_in_background
+        self.refreshing = set()
+        self.lock = threading.Lock()
+
+        if self.enabled:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS responses ('
+                    'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                    'created REAL NOT NULL, accessed REAL NOT NULL)'
+                )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether caching is turned on."""
+        return self.ttl > 0
+
+    @staticmethod
+    def make_key(prompt: str, model: str, system_prompt: str) -> str:
+        """Build a cache key; prompts differing only in case or whitespace share it."""
+        normalized = re.sub(r'\s+', ' ', prompt).strip().lower()
+        raw = json.dumps([model, system_prompt, normalized], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, calling compute() on a miss.
+
+        Args:
+            key: Cache key from make_key
+            compute: Function producing a JSON-serializable value
+
+        Returns:
+            Cached or freshly computed value
+        """
+        if not self.enabled:
+            return compute()
+
+        cached = self._get(key)
+        if cached is not None:
+            value, created = cached
+            if time.time() - created < self.ttl:
+                return value
+            if self.refresh_in_background:
+                self._refresh_later(key, compute)
+                return value
+
+        value = compute()
+        self._put(key, value)
+        return value
+
+    def get(self, key: str, refresh: Optional[Callable[[], Any]] = None) -> Optional[Any]:
+        """
+        Return the cached value if it is still fresh, otherwise None.
+
+        Args:
+            key: Cache key from make_key
+            refresh: With refresh_in_background enabled, an expired value is
+                returned as well and refresh() recomputes it in the background
+
+        Returns:
+            Cached value or None
+        """
+        if not self.enabled:
+            return None
+        cached = self._get(key)
+        if cached is None:
+            return None
+        value, created = cached
+        if time.time() - created < self.ttl:
+            return value
+        if refresh is not None and self.refresh_in_background:
+            self._refresh_later(key, refresh)
+            return value
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        """Store a value computed outside get_or_compute, e.g. from a stream."""
+        if self.enabled:
+            self._put(key, value)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _get(self, key: str) -> Optional[Tuple[Any, float]]:
+        try:
+            with self._connect() as conn:
+                row = conn.execute('SELECT value, created FROM responses WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', (time.time(), key))
+            return json.loads(row[0]), row[1]
+        except sqlite3.Error as e:
+            print(f"Response cache read failed: {e}")
+            return None
+
+    def _put(self, key: str, value: Any) -> None:
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+                    (key, json.dumps(value, ensure_ascii=False), now, now)
+                )
+                conn.execute(
+                    'DELETE FROM responses WHERE key NOT IN '
+                    '(SELECT key FROM responses ORDER BY accessed DESC LIMIT ?)',
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as e:
+            print(f"Response cache write failed: {e}")
+
+    def _refresh_later(self, key: str, compute: Callable[[], Any]) -> None:
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def refresh():
+            try:
+                value = compute()
+                if value:
+                    self._put(key, value)
+            except Exception as e:
+                print(f"Background cache refresh failed: {e}")
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+
+IDEAS_SYSTEM_PROMPT = """Ти - асистент для генерації ідей для шкільного STEAM-хакатону.
+Повертай ТІЛЬКИ валідний JSON у форматі:
+{
+  "ideas": [
+    {"title": "назва ідеї", "description": "опис 1-2 речення", "feasible_in_2_days": true},
+    ...
+  ]
+}
+
+Генеруй 6-8 ідей. Кожна ідея має бути реалістичною для виконання за 1-2 дні в школі.
+Пиши українською."""
+
+
+class IdeaStreamParser:
+    """Incremental parser for a streamed {"ideas": [...]} JSON object.
+
+    Feed it text deltas; it returns every idea object whose closing brace
+    has arrived, without waiting for the rest of the document.
+    """
+    
+    ARRAY_START = re.compile(r'"ideas"\s*:\s*\[')
+    
+    def __init__(self):
+        """Initialize an empty parser."""
+        self.buffer = ''
+        self.pos = 0
+        self.in_array = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.start = 0
+    
+    def feed(self, text: str) -> List[Dict[str, any]]:
+        """
+        Consume more streamed text.
+        
+        Args:
+            text: Next chunk of the model output
+        
+        Returns:
+            Ideas completed by this chunk
+        """
+        self.buffer += text
+        ideas = []
+        
+        if not self.in_array:
+            match = self.ARRAY_START.search(self.buffer)
+            if not match:
+                return ideas
+            self.in_array = True
+            self.pos = match.end()
+        
+        while self.pos < len(self.buffer) and not self.finished:
+            char = self.buffer[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == '{':
+                if self.depth == 0:
+                    self.start = self.pos
+                self.depth += 1
+            elif char == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        ideas.append(json.loads(self.buffer[self.start:self.pos + 1]))
+                    except json.JSONDecodeError:
+                        pass
+            elif char == ']' and self.depth == 0:
+                self.finished = True
+            self.pos += 1
+        
+        return ideas
+
+
 class IdeaGenerator:
     """Client for generating ideas using OpenAI."""
     
@@ -16,8 +274,19 @@ class IdeaGenerator:
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
         
-        self.client = OpenAI(api_key=api_key)
+        # Pooled keep-alive connections shared by the job workers; reasoning models
+        # can think for a while, so the read timeout is generous while connect fails fast.
+        # The SDK retries with jittered exponential backoff. OPENAI_BASE_URL is honoured.
+        self.client = OpenAI(
+            api_key=api_key,
+            http_client=httpx.Client(
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=120)
+            ),
+            timeout=httpx.Timeout(float(os.getenv('OPENAI_TIMEOUT', '90')), connect=5.0),
+            max_retries=int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+        )
         self.model = os.getenv('OPENAI_MODEL', 'gpt-5-mini')
+        self.cache = ResponseCache()
     
     def generate_ideas(self, prompt: str) -> List[Dict[str, any]]:
         """
@@ -29,18 +298,67 @@ class IdeaGenerator:
         Returns:
             List of idea dictionaries with 'title', 'description', 'feasible_in_2_days'
         """
-        system_prompt = """Ти - асистент для генерації ідей для шкільного STEAM-хакатону.
-Повертай ТІЛЬКИ валідний JSON у форматі:
-{
-  "ideas": [
-    {"title": "назва ідеї", "description": "опис 1-2 речення", "feasible_in_2_days": true},
-    ...
-  ]
-}
-
-Генеруй 6-8 ідей. Кожна ідея має бути реалістичною для виконання за 1-2 дні в школі.
-Пиши українською."""
+        key = self.cache.make_key(prompt, self.model, IDEAS_SYSTEM_PROMPT)
+        return self.cache.get_or_compute(key, lambda: self._generate_ideas(IDEAS_SYSTEM_PROMPT, prompt))
+    
+    def stream_ideas(self, prompt: str) -> Iterator[Dict[str, any]]:
+        """
+        Generate ideas, yielding each one as soon as the model has written it.
+        
+        Args:
+            prompt: User's brainstorming prompt
+        
+        Yields:
+            Idea dictionaries with 'title', 'description', 'feasible_in_2_days'
 
+        Raises:
+            ValueError: If the model returned no ideas
+        """
+        key = self.cache.make_key(prompt, self.model, IDEAS_SYSTEM_PROMPT)
+        cached = self.cache.get(key, refresh=lambda: self._generate_ideas(IDEAS_SYSTEM_PROMPT, prompt))
+        if cached:
+            yield from cached
+            return
+        
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": IDEAS_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"},
+            stream=True
+        )
+        
+        parser = IdeaStreamParser()
+        ideas = []
+        finished = False
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            if chunk.choices[0].finish_reason == 'stop':
+                finished = True
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            for idea in parser.feed(delta):
+                ideas.append(idea)
+                yield idea
+        
+        if not ideas:
+            # Nothing parseable came back, retry with explicit instruction
+            ideas = self._retry_with_json_instruction(prompt)
+            finished = True
+            yield from ideas
+        
+        if not ideas:
+            raise ValueError("The model returned no ideas")
+        # A stream cut off part-way is shown but not cached
+        if finished:
+            self.cache.put(key, ideas)
+    
+    def _generate_ideas(self, system_prompt: str, prompt: str) -> List[Dict[str, any]]:
+        """Ask the model for ideas, bypassing the cache."""
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
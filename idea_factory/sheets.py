@@ -3,7 +3,7 @@
 import json
 import os
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Set
 
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
@@ -12,8 +12,24 @@ from googleapiclient.discovery import build
 class SheetsClient:
     """Client for interacting with Google Sheets."""
     
-    def __init__(self):
-        """Initialize the Sheets client with service account credentials."""
+    def __init__(self, service=None):
+        """
+        Initialize the Sheets client with service account credentials.
+        
+        Args:
+            service: Prebuilt Sheets service to use instead of the real API,
+                e.g. FakeSheetsService. GOOGLE_SHEETS_FAKE=1 selects the fake.
+        """
+        if service is None and os.getenv('GOOGLE_SHEETS_FAKE') == '1':
+            from fake_sheets import FakeSheetsService
+            service = FakeSheetsService()
+        
+        if service is not None:
+            self.service = service
+            self.spreadsheet_id = os.getenv('GOOGLE_SHEETS_SPREADSHEET_ID', 'fake')
+            self.sheet_name = os.getenv('GOOGLE_SHEETS_SHEET_NAME', 'Ideas')
+            return
+        
         # Parse credentials from environment variable (JSON string)
         creds_json = os.getenv('GOOGLE_SHEETS_CREDS')
         if not creds_json:
@@ -30,7 +46,9 @@ class SheetsClient:
             scopes=['https://www.googleapis.com/auth/spreadsheets']
         )
         
-        self.service = build('sheets', 'v4', credentials=credentials)
+        # Use the discovery document bundled with the library instead of fetching it
+        self.service = build('sheets', 'v4', credentials=credentials,
+                             static_discovery=True, cache_discovery=False)
         self.spreadsheet_id = os.getenv('GOOGLE_SHEETS_SPREADSHEET_ID')
         self.sheet_name = os.getenv('GOOGLE_SHEETS_SHEET_NAME', 'Ideas')
         
@@ -48,24 +66,74 @@ class SheetsClient:
             True if successful, False otherwise
         """
         try:
-            range_name = f"{self.sheet_name}!A:J"  # Columns A through J (10 columns)
-            body = {
-                'values': [row_values]
-            }
-            
-            self.service.spreadsheets().values().append(
-                spreadsheetId=self.spreadsheet_id,
-                range=range_name,
-                valueInputOption='RAW',
-                insertDataOption='INSERT_ROWS',
-                body=body
-            ).execute()
-            
+            self.append_rows([row_values])
             return True
         except Exception as e:
             print(f"Error appending row to sheet: {e}")
             return False
     
+    def append_rows(self, rows: List[List[str]]) -> None:
+        """
+        Append several rows to the Ideas sheet in a single request.
+        
+        Args:
+            rows: Rows to append, each matching the column order (row_id last)
+        
+        Raises:
+            Exception: If the API request fails
+        """
+        range_name = f"{self.sheet_name}!A:K"  # Columns A through K (11 columns)
+        body = {
+            'values': rows
+        }
+        
+        self.service.spreadsheets().values().append(
+            spreadsheetId=self.spreadsheet_id,
+            range=range_name,
+            valueInputOption='RAW',
+            insertDataOption='INSERT_ROWS',
+            body=body
+        ).execute()
+    
+    def read_row_ids(self) -> Set[str]:
+        """
+        Read the row_id column, to check which journaled rows already landed.
+        
+        Returns:
+            Set of row ids present in the sheet
+        
+        Raises:
+            Exception: If the API request fails
+        """
+        range_name = f"{self.sheet_name}!K2:K"
+        result = self.service.spreadsheets().values().get(
+            spreadsheetId=self.spreadsheet_id,
+            range=range_name
+        ).execute()
+        
+        return {row[0] for row in result.get('values', []) if row}
+    
+    def read_rows_from(self, start_row: int) -> List[List[str]]:
+        """
+        Read rows from start_row to the end of the sheet.
+        
+        Args:
+            start_row: 1-based sheet row to start at
+        
+        Returns:
+            Rows in sheet order, empty rows included as empty lists
+        
+        Raises:
+            Exception: If the API request fails
+        """
+        range_name = f"{self.sheet_name}!A{start_row}:K"
+        result = self.service.spreadsheets().values().get(
+            spreadsheetId=self.spreadsheet_id,
+            range=range_name
+        ).execute()
+        
+        return result.get('values', [])
+    
     def read_recent_rows(self, limit: int = 50) -> Optional[List[List[str]]]:
         """
         Read recent rows from the Ideas sheet.
@@ -77,7 +145,7 @@ class SheetsClient:
             List of rows (each row is a list of values), or None on error
         """
         try:
-            range_name = f"{self.sheet_name}!A:J"
+            range_name = f"{self.sheet_name}!A:K"
             result = self.service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id,
                 range=range_name
@@ -108,12 +176,13 @@ class SheetsClient:
             'final_title',
             'final_description',
             'user_agent',
-            'ip'
+            'ip',
+            'row_id'
         ]
         
         try:
             # Check if first row exists
-            range_name = f"{self.sheet_name}!A1:J1"
+            range_name = f"{self.sheet_name}!A1:K1"
             result = self.service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id,
                 range=range_name
@@ -0,0 +1,303 @@
+"""Shared server-side storage for sessions and rate limits across workers."""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Iterator, Optional, Union
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from limits.storage import Storage
+from werkzeug.datastructures import CallbackDict
+
+DEFAULT_STORE_URL = 'sqlite:///instance/store.sqlite3'
+
+
+class SQLiteStore:
+    """Key-value store in a SQLite file, shared by all workers on one host.
+
+    Implements the subset of the redis-py client used here (get, set with
+    ex and nx, delete, incr, expire, ttl), so a redis.Redis client can be used in
+    its place.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the store.
+
+        Args:
+            path: SQLite file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS kv ('
+                'key TEXT PRIMARY KEY, '
+                'value BLOB NOT NULL, '
+                'expires REAL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS kv_expires ON kv (expires)')
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _expires(ex: Union[int, float, timedelta, None]) -> Optional[float]:
+        if ex is None:
+            return None
+        if isinstance(ex, timedelta):
+            ex = ex.total_seconds()
+        return time.time() + ex
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get a value, or None if it is missing or expired."""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: Union[str, bytes], ex: Union[int, float, timedelta, None] = None,
+            nx: bool = False) -> Optional[bool]:
+        """Set a value, expiring after ex seconds if given.
+
+        With nx the value is only set if the key is missing or expired, and
+        None is returned if it was not, as redis-py does.
+        """
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        condition = ' WHERE kv.expires IS NOT NULL AND kv.expires <= ?' if nx else ''
+        params = (key, value, self._expires(ex)) + ((time.time(),) if nx else ())
+        with self._connect() as conn:
+            changed = conn.execute(
+                'INSERT INTO kv (key, value, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires'
+                + condition,
+                params
+            ).rowcount
+            # Expired keys are only hidden on read, sweep them now and then
+            if random.random() < 0.01:
+                conn.execute('DELETE FROM kv WHERE expires <= ?', (time.time(),))
+        if nx and not changed:
+            return None
+        return True
+
+    def delete(self, *keys: str) -> int:
+        """Delete keys, returning how many existed."""
+        with self._connect() as conn:
+            return conn.executemany('DELETE FROM kv WHERE key = ?', [(key,) for key in keys]).rowcount
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        """Increment an integer value, treating a missing or expired key as 0."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT value, expires FROM kv WHERE key = ?', (key,)).fetchone()
+            if row and (row[1] is None or row[1] > now):
+                value, expires = int(row[0]) + amount, row[1]
+            else:
+                value, expires = amount, None
+            conn.execute(
+                'INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)',
+                (key, str(value).encode('utf-8'), expires)
+            )
+            conn.execute('COMMIT')
+        return value
+
+    def expire(self, key: str, ex: Union[int, float, timedelta]) -> bool:
+        """Set a key's time to live, returning False if the key is missing."""
+        with self._connect() as conn:
+            return conn.execute(
+                'UPDATE kv SET expires = ? WHERE key = ?', (self._expires(ex), key)
+            ).rowcount > 0
+
+    def ttl(self, key: str) -> int:
+        """Seconds until the key expires, -1 if it never does, -2 if it is missing."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute('SELECT expires FROM kv WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[0] is not None and row[0] <= now):
+            return -2
+        if row[0] is None:
+            return -1
+        return int(row[0] - now)
+
+    def clear(self, prefix: str) -> int:
+        """Delete every key starting with prefix."""
+        with self._connect() as conn:
+            return conn.execute(
+                'DELETE FROM kv WHERE substr(key, 1, ?) = ?', (len(prefix), prefix)
+            ).rowcount
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(url: Optional[str] = None):
+    """
+    Get the store for a URL, shared within the process.
+
+    Args:
+        url: sqlite:///relative/path, sqlite:////absolute/path or redis://host:port/db
+            (defaults to STORE_URL or sqlite:///instance/store.sqlite3)
+
+    Returns:
+        SQLiteStore, or a redis.Redis client for redis:// URLs
+    """
+    url = url or os.getenv('STORE_URL', DEFAULT_STORE_URL)
+    with _stores_lock:
+        if url not in _stores:
+            if url.startswith(('redis://', 'rediss://', 'unix://')):
+                import redis
+                _stores[url] = redis.Redis.from_url(url)
+            elif url.startswith('sqlite:///'):
+                _stores[url] = SQLiteStore(url[len('sqlite:///'):])
+            else:
+                raise ValueError(f"Unsupported STORE_URL: {url}")
+        return _stores[url]
+
+
+class SQLiteLimiterStorage(Storage):
+    """Fixed-window rate limit counters in a SQLiteStore, for storage_uri="sqlite:///..."."""
+
+    STORAGE_SCHEME = ['sqlite']
+    PREFIX = 'limiter:'
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.store = open_store(uri)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+        key = self.PREFIX + key
+        value = self.store.incr(key, amount)
+        if value == amount or elastic_expiry:
+            self.store.expire(key, expiry)
+        return value
+
+    def get(self, key: str) -> int:
+        value = self.store.get(self.PREFIX + key)
+        return int(value) if value else 0
+
+    def get_expiry(self, key: str) -> float:
+        return time.time() + max(self.store.ttl(self.PREFIX + key), 0)
+
+    def check(self) -> bool:
+        try:
+            self.store.get(self.PREFIX + 'check')
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        return self.store.clear(self.PREFIX)
+
+    def clear(self, key: str) -> None:
+        self.store.delete(self.PREFIX + key)
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session whose data lives in the store; the cookie only holds its ID."""
+
+    def __init__(self, initial=None, sid: Optional[str] = None, new: bool = False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class ServerSessionInterface(SessionInterface):
+    """Flask session interface backed by open_store().
+
+    The cookie carries a signed random session ID. Session data is
+    serialized only when it changed, so pages that just read the session
+    cost one store lookup and no cookie rewrite.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store=None, key_prefix: str = 'session:'):
+        """
+        Initialize the session interface.
+
+        Args:
+            store: Store with get/set/delete (defaults to open_store())
+            key_prefix: Prefix for session keys in the store
+        """
+        self.store = store
+        self.key_prefix = key_prefix
+
+    def _get_store(self):
+        if self.store is None:
+            self.store = open_store()
+        return self.store
+
+    def _signer(self, app) -> Signer:
+        return Signer(app.secret_key, salt='server-session')
+
+    def open_session(self, app, request) -> ServerSession:
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode('utf-8')
+            except BadSignature:
+                sid = None
+            if sid:
+                data = self._get_store().get(self.key_prefix + sid)
+                if data is not None:
+                    try:
+                        return ServerSession(self.serializer.loads(data), sid=sid)
+                    except ValueError:
+                        pass
+        return ServerSession(sid=uuid.uuid4().hex, new=True)
+
+    def save_session(self, app, session: ServerSession, response) -> None:
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                self._get_store().delete(self.key_prefix + session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.modified:
+            self._get_store().set(self.key_prefix + session.sid,
+                                  self.serializer.dumps(dict(session)),
+                                  ex=app.permanent_session_lifetime)
+
+        if session.new or (session.permanent and app.config['SESSION_REFRESH_EACH_REQUEST']):
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid).decode('utf-8'),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
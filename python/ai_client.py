@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+import httpx
+from dotenv import load_dotenv
+from openai import OpenAI
+
+load_dotenv()
+
+# one pooled HTTP client for whisper, chat and tts: the TLS handshake is paid once,
+# later calls reuse a warm keep-alive connection
+http_client = httpx.Client(
+    limits=httpx.Limits(max_connections=8, max_keepalive_connections=4, keepalive_expiry=120),
+    timeout=httpx.Timeout(30.0, connect=3.0),
+)
+
+client = None
+client_lock = threading.Lock()
+
+
+def get_client():
+    # created on first use, so modules importing this one load without an API key.
+    # OPENAI_BASE_URL (read by the SDK) points everything at mock_openai.py for offline runs
+    global client
+    with client_lock:
+        if client is None:
+            client = OpenAI(
+                api_key=os.environ.get("OPENAI_API_KEY"),
+                http_client=http_client,
+                max_retries=0,
+            )
+        return client
+
+# per endpoint timeouts and retries; the SDK backs off exponentially with jitter between attempts.
+# read timeouts are for the gap between bytes, so streamed answers can run longer than them
+POLICIES = {
+    "transcribe": {"timeout": httpx.Timeout(15.0, connect=3.0), "max_retries": 2},
+    "chat": {"timeout": httpx.Timeout(20.0, connect=3.0), "max_retries": 2},
+    "speech": {"timeout": httpx.Timeout(10.0, connect=3.0), "max_retries": 1},
+    "vision": {"timeout": httpx.Timeout(20.0, connect=3.0), "max_retries": 1},
+}
+
+
+def for_endpoint(name):
+    return get_client().with_options(**POLICIES[name])
+
+
+class Metrics:
+    # latency and token counts of the last calls per endpoint, for logs and benchmarks
+    def __init__(self, history=200):
+        self.lock = threading.Lock()
+        self.calls = defaultdict(lambda: deque(maxlen=history))
+
+    def record(self, endpoint, seconds, first_byte=None, prompt_tokens=0, completion_tokens=0, ok=True):
+        with self.lock:
+            self.calls[endpoint].append({
+                "seconds": seconds,
+                "first_byte": first_byte,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "ok": ok,
+            })
+
+    def summary(self):
+        with self.lock:
+            calls = {endpoint: list(items) for endpoint, items in self.calls.items()}
+        result = {}
+        for endpoint, items in calls.items():
+            seconds = sorted(item["seconds"] for item in items)
+            first_bytes = sorted(item["first_byte"] for item in items if item["first_byte"] is not None)
+            result[endpoint] = {
+                "calls": len(items),
+                "errors": sum(not item["ok"] for item in items),
+                "p50": percentile(seconds, 50),
+                "p95": percentile(seconds, 95),
+                "first_byte_p50": percentile(first_bytes, 50),
+                "prompt_tokens": sum(item["prompt_tokens"] for item in items),
+                "completion_tokens": sum(item["completion_tokens"] for item in items),
+            }
+        return result
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+metrics = Metrics()
+
+
+class Call:
+    # times one API call: with Call("chat") as call: ... call.first_byte() ... call.usage(usage)
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = None
+        self.first_byte_at = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def first_byte(self):
+        if self.first_byte_at is None:
+            self.first_byte_at = time.perf_counter() - self.started
+
+    def usage(self, usage):
+        if usage is not None:
+            self.prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        metrics.record(self.endpoint, seconds, self.first_byte_at,
+                       self.prompt_tokens, self.completion_tokens,
+                       ok=exc_type is None or exc_type is GeneratorExit)
+        if os.environ.get("AI_CLIENT_LOG") == "1":
+            ttfb = f" first byte {self.first_byte_at:.2f}s" if self.first_byte_at is not None else ""
+            print(f"[ai] {self.endpoint} {seconds:.2f}s{ttfb} tokens {self.prompt_tokens}/{self.completion_tokens}")
+        return False
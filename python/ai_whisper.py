@@ -1,18 +1,19 @@
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
-
-
-load_dotenv()
-client = OpenAI(
-    api_key=os.environ.get("OPENAI_API_KEY"),
-)
+from ai_client import Call, for_endpoint
 
 
 class Transcription:
     def __init__(self, audiofile):
-        self.audiofile = open(audiofile, "rb")
+        # a path on disk or a file-like object such as the recorder's BytesIO
+        self.audiofile = audiofile
 
     def write_speech(self):
-        result = client.audio.transcriptions.create(model="whisper-1", file=self.audiofile, language="uk")
+        if isinstance(self.audiofile, (str, os.PathLike)):
+            with open(self.audiofile, "rb") as f:
+                return self.transcribe(f)
+        return self.transcribe(self.audiofile)
+
+    def transcribe(self, f):
+        with Call("transcribe"):
+            result = for_endpoint("transcribe").audio.transcriptions.create(model="whisper-1", file=f, language="uk")
         return result.text
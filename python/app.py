@@ -4,6 +4,8 @@ import subprocess
 from flask import Flask, render_template, jsonify, url_for, request
 import re
 
+from playback_queue import PlaybackQueue, PRIORITIES
+
 app = Flask(__name__)
 script_process = None
 
@@ -105,30 +107,67 @@ def save_function():
         return jsonify({'success': False, 'error': str(e)})
 
 
+def play_text(text):
+    from text_to_speech import AudioResponse
+    # repeated phrases are played from the on-disk TTS cache
+    AudioResponse(text, cache=True).get_audio()
+
+
+audio_queue = PlaybackQueue(play_text)
+
+
 @app.route('/audio/play', methods=['POST'])
 def play_audio():
-    """Generate and play TTS audio from text using OpenAI."""
-    from flask import request
-    import json
-    
+    """Queue TTS audio for playback and return the job id right away."""
     data = request.get_json()
     text = data.get('text', '')
-    
+    priority = data.get('priority', 'normal')
+
     if not text:
         return jsonify({"error": "No text provided"}), 400
+    if priority not in PRIORITIES:
+        return jsonify({"error": f"Unknown priority, use one of {list(PRIORITIES)}"}), 400
 
-    try:
-        # Import and use the text_to_speech module
-        from text_to_speech import AudioResponse
-        
-        audio_response = AudioResponse(text)
-        # This will generate and play the audio
-        audio_response.get_audio()
-        
-        return jsonify({"status": "success", "message": "Audio played"}), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    job = audio_queue.submit(text, priority)
+    response = audio_queue.describe(job)
+    response["status_url"] = url_for('audio_job_status', job_id=job.id)
+    return jsonify(response), 202
+
+
+@app.route('/audio/jobs/<job_id>')
+def audio_job_status(job_id):
+    """Status of a queued playback job."""
+    job = audio_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(audio_queue.describe(job))
+
+
+@app.route('/audio/prewarm', methods=['POST'])
+def prewarm_audio():
+    """Synthesize a list of known phrases into the TTS cache in the background."""
+    data = request.get_json()
+    texts = [t for t in data.get('texts', []) if isinstance(t, str) and t.strip()]
+
+    if not texts:
+        return jsonify({"error": "No texts provided"}), 400
+
+    from text_to_speech import prewarm
+    prewarm(texts)
+    return jsonify({"status": "accepted", "count": len(texts)}), 202
+
+
+def prewarm_from_file():
+    # TTS_PREWARM_FILE: one phrase per line, cached when the app starts
+    path = os.environ.get("TTS_PREWARM_FILE")
+    if not path or not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        texts = [line.strip() for line in f if line.strip()]
+    from text_to_speech import prewarm
+    prewarm(texts)
 
 
 if __name__ == "__main__":
+    prewarm_from_file()
     app.run(host="0.0.0.0", port=8000, debug=True)
@@ -1,8 +1,11 @@
-import sounddevice as sd
 from scipy.io.wavfile import write
+import io
 import os
+import threading
 import numpy as np
+from devices import input_stream
 from integration import on_audio_recorder
+from text_to_speech import play_cue
 
 
 cur_dir = os.path.dirname(__file__)
@@ -15,48 +18,172 @@ filename = "output.wav"
 file_path = os.path.join(save_directory, filename)
 
 
+class RingBuffer:
+    # preallocated circular buffer of samples, written from the audio callback
+    def __init__(self, capacity, dtype="float32"):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.written = 0  # total samples ever written
+
+    def write(self, samples):
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            self.written += n - self.capacity
+            n = self.capacity
+        start = self.written % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            self.data[start:end] = samples
+        else:
+            split = self.capacity - start
+            self.data[start:] = samples[:split]
+            self.data[:end - self.capacity] = samples[split:]
+        self.written += n
+
+    def read(self, start, end):
+        # copy of samples with absolute indexes [start, end)
+        start = max(start, self.written - self.capacity, 0)
+        end = min(end, self.written)
+        if end <= start:
+            return np.zeros(0, dtype=self.data.dtype)
+        a = start % self.capacity
+        b = a + (end - start)
+        if b <= self.capacity:
+            return self.data[a:b].copy()
+        return np.concatenate((self.data[a:], self.data[:b - self.capacity]))
+
+
+class VoiceActivityDetector:
+    # frame-level energy / zero-crossing detector with an adaptive noise floor
+    def __init__(self, fs, frame_ms=20, hangover_ms=200, min_speech_ms=100,
+                 energy_ratio=3.0, min_energy=0.01, max_zcr=0.35):
+        self.frame_len = int(fs * frame_ms / 1000)
+        self.hangover_frames = max(1, int(hangover_ms / frame_ms))
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.energy_ratio = energy_ratio
+        self.min_energy = min_energy
+        self.max_zcr = max_zcr
+        self.reset()
+
+    def reset(self):
+        self.noise_floor = None
+        self.in_speech = False
+        self.speech_frames = 0
+        self.silence_frames = 0
+
+    def is_speech_frame(self, frame):
+        rms = float(np.sqrt(np.mean(np.square(frame))))
+        signs = np.signbit(frame)
+        zcr = np.count_nonzero(signs[1:] != signs[:-1]) / len(frame)
+
+        if self.noise_floor is None:
+            self.noise_floor = rms
+        threshold = max(self.noise_floor * self.energy_ratio, self.min_energy)
+        speech = rms > threshold and zcr < self.max_zcr
+        if not speech:
+            # track background noise only while nobody is talking
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+        return speech
+
+    def process(self, frame):
+        # returns "start", "end" or None
+        speech = self.is_speech_frame(frame)
+        if not self.in_speech:
+            self.speech_frames = self.speech_frames + 1 if speech else 0
+            if self.speech_frames >= self.min_speech_frames:
+                self.in_speech = True
+                self.silence_frames = 0
+                return "start"
+            return None
+
+        self.silence_frames = 0 if speech else self.silence_frames + 1
+        if self.silence_frames >= self.hangover_frames:
+            self.in_speech = False
+            self.speech_frames = 0
+            return "end"
+        return None
+
+
+def to_wav_bytes(samples, fs, name=filename):
+    # encode float samples as an in-memory 16-bit WAV the OpenAI client can upload
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    write(buffer, fs, pcm)
+    buffer.name = name
+    buffer.seek(0)
+    return buffer
+
+
 class VoiceRecorder:
-    def __init__(self):
+    def __init__(self, save_to_disk=False):
+        # keep a copy of every utterance in ../audio/output.wav for debugging
+        self.save_to_disk = save_to_disk or os.environ.get("AUDIO_SAVE_TO_DISK") == "1"
         self.fs = 11025
         self.recordtime = 15
-        self.recordtime1 = 1
         self.channels = 1
+        self.frame_ms = 20
+        self.hangover_ms = 200
+        self.preroll_ms = 300
+        self.start_timeout = 10
+
+    def capture_utterance(self, is_muted=None):
+        # record one utterance from a continuous input stream, None if nobody spoke.
+        # frames arriving while is_muted() is true (robot talking) are ignored
+        vad = VoiceActivityDetector(self.fs, frame_ms=self.frame_ms, hangover_ms=self.hangover_ms)
+        preroll = int(self.fs * self.preroll_ms / 1000)
+        max_samples = int(self.fs * self.recordtime)
+        ring = RingBuffer(max_samples + preroll + vad.frame_len)
+        done = threading.Event()
+        bounds = {"start": None, "end": None}
+
+        def callback(indata, frames, time_info, status):
+            if done.is_set() or (is_muted is not None and is_muted()):
+                return
+            frame = indata[:, 0]
+            ring.write(frame)
+            event = vad.process(frame)
+            if event == "start":
+                speech_frames = vad.speech_frames * vad.frame_len
+                bounds["start"] = max(0, ring.written - speech_frames - preroll)
+            elif event == "end":
+                bounds["end"] = ring.written
+                done.set()
+            elif bounds["start"] is not None and ring.written - bounds["start"] >= max_samples:
+                bounds["end"] = ring.written
+                done.set()
 
-    def record_voice(self):
+        with input_stream(self.fs, self.channels, vad.frame_len, callback):
+            if not done.wait(self.start_timeout):
+                if bounds["start"] is None:
+                    done.set()
+                    return None
+                done.wait(self.recordtime)
+            done.set()
+
+        start = bounds["start"]
+        end = bounds["end"] if bounds["end"] is not None else ring.written
+        return ring.read(start, end)
+
+    def record_voice(self, ready_cue=True, is_muted=None):
+        # returns the utterance as an in-memory WAV file, None if nobody spoke
         print('start recording')
-        ready_path = os.path.join(save_directory, "ready.wav")
-        os.system(f"aplay {ready_path}")
-
-        # remove file if it exists
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
-        res = None
-        for i in range(self.recordtime):
-            myrecording = sd.rec(int(self.recordtime1 * self.fs), samplerate=self.fs, channels=self.channels)
-            sd.wait()
-
-            if res is not None:
-                print(len(res))
-                average_amplitude = np.mean(np.abs(res))
-                std_amp = np.std(res)
-                average_amplitude1 = np.mean(np.abs(myrecording))
-                print("Середнє значення амплітуди:", average_amplitude, average_amplitude1)
-                print("std", std_amp)
-                if average_amplitude1 < average_amplitude / 3:
-                    break
-
-            if res is None:
-                res = myrecording
-            else:
-                res = np.concatenate((res, myrecording), axis=None)
-
-        print(std_amp, average_amplitude)
-        if std_amp < 0.015 or average_amplitude < 0.03:
+        if ready_cue:
+            ready_path = os.path.join(save_directory, "ready.wav")
+            play_cue(ready_path).wait()
+
+        res = self.capture_utterance(is_muted)
+        if res is None:
             # не записувати файл якщо не було звуку
             print('empty recording')
-            return
+            return None
+
+        print('voice recorded', len(res) / self.fs, 's')
+        wav = to_wav_bytes(res, self.fs)
+        if self.save_to_disk:
+            with open(file_path, "wb") as f:
+                f.write(wav.getbuffer())
 
-        print('voice recorded')
-        write(file_path, self.fs, res)
-        on_audio_recorder(file_path)
+        on_audio_recorder(wav)
+        wav.seek(0)
+        return wav
@@ -0,0 +1,58 @@
+import argparse
+import time
+
+import numpy as np
+from scipy.signal import butter, lfilter
+
+from dsp import BANDSTOP_FREQUENCIES, PCM_RATE, Q_FACTOR, RobotVoiceFilter, TempoStretcher
+
+# Robot-voice DSP micro-benchmark, run it on the Pi:
+#   ../venv/bin/python bench_dsp.py --seconds 30
+
+
+def legacy_process(buffer, fs):
+    # the filter chain as it was: five butter() designs and float64 lfilter passes per chunk
+    signal = np.frombuffer(buffer, dtype='int16')
+    nyquist = 0.5 * fs
+    for freq in BANDSTOP_FREQUENCIES:
+        lowcut = freq - (freq / Q_FACTOR)
+        highcut = freq + (freq / Q_FACTOR)
+        b, a = butter(2, [lowcut / nyquist, highcut / nyquist], btype='bandstop')
+        signal = lfilter(b, a, signal)
+    return signal.astype('int16')
+
+
+def make_signal(seconds, fs):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * fs)) / fs
+    voice = 6000 * np.sin(2 * np.pi * 180 * t) * (1 + np.sin(2 * np.pi * 3 * t))
+    return (voice + rng.normal(0, 1500, len(t))).astype(np.int16)
+
+
+def run(name, fn, signal, chunk):
+    start = time.perf_counter()
+    for i in range(0, len(signal), chunk):
+        fn(signal[i:i + chunk])
+    elapsed = time.perf_counter() - start
+    rate = len(signal) / elapsed
+    print(f"{name:<16} {rate / 1e6:8.2f} Msamples/s  {rate / PCM_RATE:8.1f}x realtime")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the TTS post-processing chain")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--chunk", type=int, default=2048, help="samples per chunk, as streamed from TTS")
+    args = parser.parse_args()
+
+    signal = make_signal(args.seconds, PCM_RATE)
+    print(f"{args.seconds:g} s of audio at {PCM_RATE} Hz, {args.chunk} sample chunks")
+
+    run("legacy lfilter", lambda c: legacy_process(c.tobytes(), PCM_RATE), signal, args.chunk)
+    robot = RobotVoiceFilter(PCM_RATE)
+    run("sos filter bank", robot.process, signal, args.chunk)
+    stretcher = TempoStretcher(1.4)
+    run("tempo 1.4", lambda c: stretcher.process(c.astype(np.float32)), signal, args.chunk)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import tempfile
+import time
+
+# Load test of the whole conversation pipeline (capture -> stt -> llm -> tts -> playback) on
+# simulated devices: the microphone replays a WAV file, the speaker only keeps time.
+# Offline against the mock server:
+#   python mock_openai.py &
+#   OPENAI_BASE_URL=http://127.0.0.1:8808/v1 OPENAI_API_KEY=mock python bench_pipeline.py --seconds 60
+# Profile it with: python -m cProfile -o pipeline.prof bench_pipeline.py
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the voice pipeline on simulated devices and report latencies")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="run simulated audio this many times faster than real time")
+    parser.add_argument("--input", help="WAV file the simulated microphone replays")
+    parser.add_argument("--record", help="keep everything the simulated speaker played in this WAV file")
+    args = parser.parse_args()
+
+    # before the pipeline modules are imported, they pick their devices on import or first use
+    os.environ["DEVICES"] = "sim"
+    os.environ["SIM_SPEED"] = str(args.speed)
+    os.environ["AUDIO_INPUT"] = f"sim:{args.input}" if args.input else "sim"
+    os.environ["AUDIO_OUTPUT"] = f"sim:{args.record}" if args.record else "sim"
+    os.environ.setdefault("TRACE_DIR", tempfile.mkdtemp(prefix="bench_pipeline_"))
+
+    from ai_client import metrics
+    from pipeline import ConversationPipeline
+    from traces import TraceStore, report
+
+    pipeline = ConversationPipeline()
+    pipeline.start()
+    time.sleep(args.seconds)
+    pipeline.stop()
+    pipeline.join()
+
+    print()
+    report(list(TraceStore(os.environ["TRACE_DIR"]).read()))
+    print(f"traces in {os.environ['TRACE_DIR']}")
+    if args.speed != 1:
+        print(f"audio ran {args.speed:g}x faster, so capture and playback spans are shorter than on the robot")
+
+    print()
+    for endpoint, stats in metrics.summary().items():
+        print(f"{endpoint:<12} calls {stats['calls']:3d}  errors {stats['errors']:2d}  "
+              f"p50 {stats['p50']:6.2f}s  p95 {stats['p95']:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
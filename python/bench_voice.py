@@ -0,0 +1,72 @@
+import argparse
+import io
+import time
+import wave
+
+from ai_client import metrics, percentile
+from ai_whisper import Transcription
+from chatgpt_response import ResponseEngine
+from conversation_memory import ConversationMemory
+from text_to_speech import AudioResponse
+
+# End-to-end latency of one voice turn (whisper -> streamed chat -> streamed tts), without the speaker.
+# Offline against the mock server:
+#   python mock_openai.py &
+#   OPENAI_BASE_URL=http://127.0.0.1:8808/v1 OPENAI_API_KEY=mock python bench_voice.py --turns 10
+
+
+def silent_wav(seconds=1.5, fs=16000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(fs)
+        wav.writeframes(b"\x00\x00" * int(seconds * fs))
+    buffer.name = "speech.wav"
+    buffer.seek(0)
+    return buffer
+
+
+def run_turn(history):
+    start = time.perf_counter()
+    text = Transcription(silent_wav()).write_speech()
+    transcribed = time.perf_counter()
+
+    first_audio = None
+    engine = ResponseEngine(text, history, False)
+    for sentence in engine.stream_response():
+        for chunk in AudioResponse(sentence).synthesize_chunks():
+            if first_audio is None and len(chunk):
+                first_audio = time.perf_counter()
+    done = time.perf_counter()
+    return {
+        "transcribe": transcribed - start,
+        "first_audio": (first_audio or done) - start,
+        "total": done - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a full voice turn against the API or mock_openai.py")
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+
+    history = ConversationMemory()
+    turns = [run_turn(history) for _ in range(args.turns)]
+
+    print(f"{args.turns} turns")
+    for name in ("transcribe", "first_audio", "total"):
+        values = sorted(turn[name] for turn in turns)
+        print(f"{name:<12} p50 {percentile(values, 50):6.2f}s  p95 {percentile(values, 95):6.2f}s")
+
+    print()
+    for endpoint, stats in metrics.summary().items():
+        first_byte = stats["first_byte_p50"]
+        first_byte = f"{first_byte:6.2f}s" if first_byte is not None else "     -"
+        print(f"{endpoint:<12} calls {stats['calls']:3d}  errors {stats['errors']:2d}  "
+              f"p50 {stats['p50']:6.2f}s  p95 {stats['p95']:6.2f}s  first byte {first_byte}  "
+              f"tokens {stats['prompt_tokens']}/{stats['completion_tokens']}")
+
+
+if __name__ == "__main__":
+    main()
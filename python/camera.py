@@ -1,11 +1,335 @@
-from picamzero import Camera
+import itertools
+import os
+import threading
+import time
+
+import numpy as np
+
+from devices import setting, sim_speed
 from integration import on_camera_image
 
+LORES_SIZE = (320, 240)
+FULL_SIZE = (1280, 960)
+
+
+class PicamSource:
+    # keeps the camera streaming: a small grayscale frame for motion checks every tick,
+    # the full colour frame only when something is forwarded. picamzero is a wrapper
+    # around picamera2, which gives us the second low-res stream for free
+    def __init__(self, lores_size=LORES_SIZE, full_size=FULL_SIZE):
+        from picamera2 import Picamera2
+        self.camera = Picamera2()
+        config = self.camera.create_video_configuration(
+            main={"size": full_size, "format": "RGB888"},
+            lores={"size": lores_size, "format": "YUV420"},
+        )
+        self.camera.configure(config)
+        self.camera.start()
+        self.lores_size = lores_size
+
+    def read(self):
+        # the Y plane of YUV420 is the grayscale image, no conversion needed
+        width, height = self.lores_size
+        return self.camera.capture_array("lores")[:height, :width]
+
+    def capture_full(self):
+        # RGB888 is stored as BGR in memory
+        return self.camera.capture_array("main")[..., ::-1]
+
+    def close(self):
+        self.camera.stop()
+        self.camera.close()
+
+
+class SyntheticSource:
+    # a square that jumps to a new place every `move_every` frames on a noisy background,
+    # for running the camera loop without a camera
+    def __init__(self, lores_size=LORES_SIZE, full_size=FULL_SIZE, move_every=25, seed=0):
+        self.width, self.height = lores_size
+        self.full_size = full_size
+        self.move_every = move_every
+        self.rng = np.random.default_rng(seed)
+        self.count = 0
+        self.position = (0, 0)
+        self.frame = None
+
+    def read(self):
+        if self.count % self.move_every == 0:
+            self.position = (int(self.rng.integers(0, self.height - 40)), int(self.rng.integers(0, self.width - 40)))
+        self.count += 1
+        frame = self.rng.integers(90, 100, (self.height, self.width), dtype=np.uint8)
+        y, x = self.position
+        frame[y:y + 40, x:x + 40] = 220
+        self.frame = frame
+        return frame
+
+    def capture_full(self):
+        width, height = self.full_size
+        rows = np.arange(height) * self.height // height
+        cols = np.arange(width) * self.width // width
+        gray = self.frame[rows[:, None], cols]
+        return np.repeat(gray[:, :, None], 3, axis=2)
+
+    def close(self):
+        pass
+
+
+class VideoSource:
+    # replays a video file in a loop at its own frame rate (times SIM_SPEED), needs opencv.
+    # every read() returns the frame due at this moment, frames in between are skipped with
+    # grab(), which doesn't decode them
+    def __init__(self, path, lores_size=LORES_SIZE, speed=None):
+        import cv2
+        self.cv2 = cv2
+        self.path = path
+        self.lores_size = lores_size
+        self.speed = speed or sim_speed()
+        self.video = cv2.VideoCapture(path)
+        self.fps = self.video.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.started = None
+        self.position = -1  # index of the frame in self.frame
+        self.frame = None
+        self.gray = None
+
+    def rewind(self, now):
+        self.video.set(self.cv2.CAP_PROP_POS_FRAMES, 0)
+        self.started = now
+        self.position = -1
+
+    def read(self):
+        now = time.monotonic()
+        if self.started is None:
+            self.started = now
+        due = int((now - self.started) * self.speed * self.fps)
+        if self.frame_count > 0 and due >= self.frame_count:
+            # start the next loop from the frame that is due in it
+            self.rewind(now - (due % self.frame_count) / self.fps / self.speed)
+            due %= self.frame_count
+        if due == self.position:
+            return self.gray
+
+        while self.position < due - 1 and self.video.grab():
+            self.position += 1
+        ok, frame = self.video.read()
+        if not ok:
+            # the container's frame count can be off, loop on the real end of the file
+            self.rewind(now)
+            ok, frame = self.video.read()
+            if not ok:
+                raise IOError(f"cannot read video {self.path}")
+        self.position += 1
+        self.frame = frame
+        small = self.cv2.resize(frame, self.lores_size, interpolation=self.cv2.INTER_AREA)
+        self.gray = self.cv2.cvtColor(small, self.cv2.COLOR_BGR2GRAY)
+        return self.gray
+
+    def capture_full(self):
+        return self.frame[..., ::-1]
+
+    def close(self):
+        self.video.release()
+
+
+def make_source(spec=None):
+    # CAMERA_SOURCE: picam (default), synthetic, or video:/path/to/file.mp4
+    spec = spec or setting("CAMERA_SOURCE")
+    if spec == "synthetic":
+        return SyntheticSource()
+    if spec.startswith("video:"):
+        return VideoSource(spec[len("video:"):])
+    return PicamSource()
+
+
+class FrameRing:
+    # the last `capacity` low-res frames in one preallocated array, oldest overwritten first
+    def __init__(self, capacity, shape):
+        self.capacity = capacity
+        self.frames = np.zeros((capacity,) + shape, dtype=np.uint8)
+        self.times = np.zeros(capacity)
+        self.written = 0
+        self.lock = threading.Lock()
+
+    def push(self, frame, timestamp):
+        with self.lock:
+            index = self.written % len(self.frames)
+            self.frames[index] = frame
+            self.times[index] = timestamp
+            self.written += 1
+
+    def latest(self, count=1):
+        # copies, oldest first
+        with self.lock:
+            count = min(count, self.written, len(self.frames))
+            indexes = [(self.written - count + i) % len(self.frames) for i in range(count)]
+            return self.frames[indexes].copy(), self.times[indexes].copy()
+
+
+def motion_score(previous, current, pixel_threshold=25, step=2):
+    # share of pixels that changed noticeably, on every `step`-th pixel to keep it cheap
+    a = previous[::step, ::step].astype(np.int16)
+    b = current[::step, ::step].astype(np.int16)
+    return float(np.mean(np.abs(a - b) > pixel_threshold))
+
+
+def encode_jpeg(rgb, quality=85):
+    # simplejpeg comes with picamera2 and is the fastest, Pillow is the fallback
+    try:
+        import simplejpeg
+        return simplejpeg.encode_jpeg(np.ascontiguousarray(rgb), quality=quality, colorspace="RGB")
+    except ImportError:
+        import io
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.fromarray(rgb).save(buffer, format="JPEG", quality=quality)
+        return buffer.getvalue()
+
+
+frame_directory = "/dev/shm" if os.path.isdir("/dev/shm") else "."
+frame_numbers = itertools.count()
+
+
+class Frame:
+    # one capture shared by every handler without copies: frame.array is a read-only RGB
+    # numpy array, frame.gray the low-res grayscale used for motion checks. the JPEG is only
+    # encoded when a handler asks for it, once. os.fspath(frame) (or open(frame, "rb"))
+    # writes it to a file of its own in RAM-backed /dev/shm for code that wants a file;
+    # the file is deleted when the frame is released. frame.recent_frames(n) gives the
+    # low-res frames that led up to this capture
+    def __init__(self, array, gray=None, timestamp=None, motion=None, ring=None):
+        array.flags.writeable = False
+        if gray is not None:
+            gray.flags.writeable = False
+        self.array = array
+        self.gray = gray
+        self.timestamp = timestamp or time.time()
+        self.motion = motion
+        self.ring = ring
+        self.lock = threading.RLock()
+        self.jpeg_bytes = None
+        self.number = next(frame_numbers)
+        self.path = None
+
+    @property
+    def height(self):
+        return self.array.shape[0]
+
+    @property
+    def width(self):
+        return self.array.shape[1]
+
+    def recent_frames(self, count=8):
+        # (frames, timestamps) oldest first, up to the moment this frame was captured
+        if self.ring is None:
+            return np.zeros((0, 0, 0), dtype=np.uint8), np.zeros(0)
+        frames, times = self.ring.latest(self.ring.capacity)
+        keep = times <= self.timestamp
+        return frames[keep][-count:], times[keep][-count:]
+
+    def jpeg(self):
+        with self.lock:
+            if self.jpeg_bytes is None:
+                self.jpeg_bytes = encode_jpeg(self.array)
+            return self.jpeg_bytes
+
+    def save(self, filename):
+        with open(filename, "wb") as f:
+            f.write(self.jpeg())
+        return filename
+
+    def __fspath__(self):
+        with self.lock:
+            if self.path is None:
+                path = os.path.join(frame_directory, f"bender_frame_{os.getpid()}_{self.number}.jpg")
+                self.path = self.save(path)
+            return self.path
+
+    def __del__(self):
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def __array__(self, dtype=None, copy=None):
+        return self.array if dtype is None else self.array.astype(dtype)
+
 
 class BenderCamera:
-    def __init__(self):
-        self.camera = Camera()
+    # polls low-res frames at `fps` and forwards a full frame to on_camera_image only when the
+    # scene changed by more than motion_threshold since the last forwarded one (and at most every
+    # min_interval seconds). heartbeat forwards a frame anyway after that many seconds of stillness.
+    # every handler gets the same Frame object
+    def __init__(self, source=None, fps=5, motion_threshold=0.02, min_interval=1.0, heartbeat=60.0,
+                 ring_size=32, handlers=None):
+        self.source = source or make_source()
+        self.handlers = list(handlers) if handlers is not None else [on_camera_image]
+        self.fps = fps
+        self.motion_threshold = motion_threshold
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+        self.ring_size = ring_size
+        self.ring = None
+        self.reference = None
+        self.last_forward = 0
+        self.stop_event = threading.Event()
+
+    def tick(self):
+        now = time.time()
+        frame = self.source.read()
+        if self.ring is None:
+            self.ring = FrameRing(self.ring_size, frame.shape)
+        self.ring.push(frame, now)
+
+        if self.reference is None:
+            motion = 1.0
+        else:
+            motion = motion_score(self.reference, frame)
+        due = motion > self.motion_threshold and now - self.last_forward >= self.min_interval
+        if due or (self.heartbeat and now - self.last_forward >= self.heartbeat):
+            self.reference = frame.copy()
+            self.last_forward = now
+            self.forward(Frame(self.source.capture_full(), self.reference, now, motion, self.ring))
+            return True
+        return False
+
+    def recent_frames(self, count=8):
+        # the last `count` low-res grayscale frames and their timestamps, oldest first
+        if self.ring is None:
+            return np.zeros((0, 0, 0), dtype=np.uint8), np.zeros(0)
+        return self.ring.latest(count)
+
+    def add_handler(self, handler):
+        self.handlers.append(handler)
+
+    def forward(self, frame):
+        for handler in self.handlers:
+            try:
+                handler(frame)
+            except Exception as e:
+                print(f"camera handler {getattr(handler, '__name__', handler)} failed: {e}")
+
+    def take_picture(self):
+        gray = self.source.read()
+        frame = Frame(self.source.capture_full(), gray.copy(), ring=self.ring)
+        self.forward(frame)
+        return frame
+
+    def run(self):
+        period = 1 / self.fps
+        next_tick = time.monotonic()
+        while not self.stop_event.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"camera tick failed: {e}")
+            next_tick += period
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                self.stop_event.wait(delay)
+            else:
+                next_tick = time.monotonic()
 
-    def take_picture(self, filename="image.jpg"):
-        self.camera.take_photo(filename)
-        on_camera_image(filename)
+    def stop(self):
+        self.stop_event.set()
+        self.source.close()
@@ -1,39 +1,116 @@
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
+import re
+import time
+from ai_client import Call, for_endpoint, get_client
 from integration import on_question_received
 
-load_dotenv()
-client = OpenAI(
-    api_key=os.environ.get("OPENAI_API_KEY"),
-)
+
+SENTENCE_END = re.compile(r"[.!?…]+[\"')»]*\s+|\n+")
+
+
+class SentenceChunker:
+    # cuts streamed text into sentences; short ones are glued to the next so TTS gets natural phrases
+    def __init__(self, min_chars=12):
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, text):
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            if match.end() - start < self.min_chars:
+                continue
+            sentences.append(self.buffer[start:match.end()].strip())
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return [s for s in sentences if s]
+
+    def flush(self):
+        tail = self.buffer.strip()
+        self.buffer = ""
+        return tail
 
 
 class ResponseEngine:
     def __init__(self, text, history, censoring):
         self.completion = None
-        self.client = client
+        self.response = None
+        self.first_token_at = None
+        self.client = get_client()
         self.text = text
         self.history = history
         self.censoring = censoring
 
-    def get_response(self):
+    def prepare(self):
+        # history is a ConversationMemory, it keeps itself under its token budget
         on_question_received(self.text, self)
 
-        if len(self.history) > 10:
-            del self.history[0]
+    def get_response(self):
+        self.prepare()
 
-        self.completion = client.chat.completions.create(
-            model="gpt-4o",
-            messages=self.history,
-        )
+        with Call("chat") as call:
+            self.completion = for_endpoint("chat").chat.completions.create(
+                model="gpt-4o",
+                messages=self.history.messages(),
+            )
+            call.usage(self.completion.usage)
         response = self.completion.choices[0].message.content
         # add the new answer
         self.history.append({ "role": "assistant", "content": response})
         return response
 
+    def stream_response(self):
+        # yields the answer sentence by sentence while the model is still writing it
+        self.prepare()
+
+        chunker = SentenceChunker()
+        parts = []
+        with Call("chat") as call:
+            stream = for_endpoint("chat").chat.completions.create(
+                model="gpt-4o",
+                messages=self.history.messages(),
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                if chunk.usage:
+                    call.usage(chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                call.first_byte()
+                if self.first_token_at is None:
+                    self.first_token_at = time.time()
+                parts.append(delta)
+                yield from chunker.feed(delta)
+
+        tail = chunker.flush()
+        if tail:
+            yield tail
+
+        self.response = "".join(parts)
+        # add the new answer
+        self.history.append({"role": "assistant", "content": self.response})
+
     def add_system(self, prompt):
         self.history.append({"role": "system", "content": prompt})
 
     def add_user(self, prompt):
         self.history.append({"role": "user", "content": prompt})
+
+
+def summarize_turns(previous, messages, max_tokens=200):
+    # folds turns evicted from ConversationMemory into the running summary, on a cheap model
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    prompt = (f"Попередній підсумок: {previous or '-'}\n\nНові репліки:\n{transcript}\n\n"
+              "Онови підсумок розмови у 2-4 реченнях: факти про співрозмовника, теми, домовленості.")
+    with Call("summary") as call:
+        completion = for_endpoint("chat").chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+        )
+        call.usage(completion.usage)
+    return completion.choices[0].message.content.strip()
@@ -0,0 +1,132 @@
+import threading
+from collections import deque
+
+try:
+    import tiktoken
+    encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    encoding = None
+
+MESSAGE_OVERHEAD = 4  # role and separators the chat format adds to every message
+
+
+def count_tokens(text):
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # without tiktoken: Cyrillic runs at roughly 3 characters per token, Latin at 4
+    return len(text) // 3 + 1
+
+
+def truncate_tokens(text, limit):
+    if limit <= 0:
+        return ""
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        return text if len(tokens) <= limit else encoding.decode(tokens[:limit])
+    return text[:(limit - 1) * 3]
+
+
+def message_tokens(message):
+    return count_tokens(message["content"] or "") + MESSAGE_OVERHEAD
+
+
+class ConversationMemory:
+    # chat history for ResponseEngine: system messages are pinned and never evicted, the
+    # other turns live in a deque trimmed from the oldest end to stay under max_tokens.
+    # with a summarizer, evicted turns are folded into a running summary in the background
+    # and sent right after the system prompt, so long sessions keep the gist at a fixed cost.
+    # the summary is cut to summary_share of the budget left after the pinned messages
+    def __init__(self, max_tokens=2000, summarizer=None, summary_share=0.5):
+        self.max_tokens = max_tokens
+        self.summarizer = summarizer
+        self.summary_share = summary_share
+        self.pinned = []
+        self.turns = deque()
+        self.tokens = 0
+        self.summary = ""
+        self.evicted = []
+        self.summarizing = False
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.pinned) + len(self.turns)
+
+    def __iter__(self):
+        return iter(self.messages())
+
+    def append(self, message):
+        with self.lock:
+            if message["role"] == "system":
+                self.pinned.append(message)
+                return
+            self.turns.append(message)
+            self.tokens += message_tokens(message)
+            self.trim()
+
+    def trim(self):
+        # always keep the newest message, it is the question being answered
+        budget = self.max_tokens - sum(message_tokens(m) for m in self.pinned)
+        if self.summary:
+            budget -= message_tokens(self.summary_message())
+        evicted = []
+        while self.tokens > budget and len(self.turns) > 1:
+            message = self.turns.popleft()
+            self.tokens -= message_tokens(message)
+            evicted.append(message)
+        # don't start the window with an orphaned assistant answer
+        while len(self.turns) > 1 and self.turns[0]["role"] == "assistant":
+            message = self.turns.popleft()
+            self.tokens -= message_tokens(message)
+            evicted.append(message)
+
+        if evicted and self.summarizer is not None:
+            self.evicted.extend(evicted)
+            if not self.summarizing:
+                self.summarizing = True
+                threading.Thread(target=self.summarize, name="memory-summary", daemon=True).start()
+
+    def summarize(self):
+        while True:
+            with self.lock:
+                evicted, self.evicted = self.evicted, []
+                previous = self.summary
+                if not evicted:
+                    self.summarizing = False
+                    return
+            try:
+                summary = self.summarizer(previous, evicted)
+            except Exception as e:
+                print(f"Failed to summarize conversation: {e}")
+                summary = previous
+            with self.lock:
+                self.summary = truncate_tokens(summary, self.summary_limit())
+                # a longer summary leaves less room for the turns; anything trimmed now is
+                # picked up by the next round of this loop
+                self.trim()
+
+    def summary_limit(self):
+        budget = self.max_tokens - sum(message_tokens(m) for m in self.pinned)
+        return int(budget * self.summary_share) - message_tokens(self.summary_message(""))
+
+    def summary_message(self, summary=None):
+        summary = self.summary if summary is None else summary
+        return {"role": "system", "content": f"Коротко про попередню розмову: {summary}"}
+
+    def messages(self):
+        with self.lock:
+            messages = list(self.pinned)
+            if self.summary:
+                messages.append(self.summary_message())
+            messages.extend(self.turns)
+            return messages
+
+    def prompt_tokens(self):
+        return sum(message_tokens(m) for m in self.messages())
+
+    def clear(self):
+        with self.lock:
+            self.turns.clear()
+            self.tokens = 0
+            self.summary = ""
+            self.evicted = []
@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+import wave
+
+import numpy as np
+
+# Which hardware the robot talks to. DEVICES=sim swaps every device for a simulated one,
+# so main.py runs (and can be load-tested and profiled) on a plain Linux box; each device
+# can also be chosen on its own:
+#   AUDIO_INPUT    mic (default) | sim | sim:/path/to/speech.wav
+#   AUDIO_OUTPUT   speaker (default) | sim | sim:/path/to/recording.wav
+#   CAMERA_SOURCE  picam (default) | synthetic | video:/path/to/file.mp4
+#   EYES_GPIO      rpi (default) | mock
+#   SIM_SPEED      how many times faster than real time simulated audio and video run, 1 by default
+# hardware libraries (sounddevice, picamera2, RPi.GPIO) are only imported by the real devices
+
+cur_dir = os.path.dirname(__file__)
+audio_directory = os.path.join(cur_dir, "..", "audio")
+SIM_SPEECH_PATH = os.path.join(audio_directory, "nice.wav")
+
+DEFAULTS = {
+    "AUDIO_INPUT": ("mic", "sim"),
+    "AUDIO_OUTPUT": ("speaker", "sim"),
+    "CAMERA_SOURCE": ("picam", "synthetic"),
+    "EYES_GPIO": ("rpi", "mock"),
+}
+
+
+def setting(name):
+    value = os.environ.get(name)
+    if value:
+        return value
+    real, sim = DEFAULTS[name]
+    return sim if os.environ.get("DEVICES") == "sim" else real
+
+
+def sim_speed():
+    return float(os.environ.get("SIM_SPEED", 1))
+
+
+def split_spec(spec):
+    # "sim:/some/file.wav" -> ("sim", "/some/file.wav"), "sim" -> ("sim", None)
+    kind, _, path = spec.partition(":")
+    return kind, path or None
+
+
+def read_wav(path, fs=None):
+    # mono float32 in [-1, 1], resampled to fs if given
+    with wave.open(path, "rb") as wav:
+        rate = wav.getframerate()
+        channels = wav.getnchannels()
+        data = wav.readframes(wav.getnframes())
+        width = wav.getsampwidth()
+    if width != 2:
+        raise ValueError(f"{path}: only 16-bit WAV files are supported")
+    samples = np.frombuffer(data, dtype="<i2").reshape(-1, channels).mean(axis=1) / 32768
+    if fs is not None and fs != rate:
+        positions = np.arange(int(len(samples) * fs / rate)) * rate / fs
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return samples.astype(np.float32), fs or rate
+
+
+class SimInputStream:
+    # stands in for sounddevice.InputStream: calls callback(indata, frames, time, status) with
+    # blocks of `gap` seconds of quiet room noise followed by a WAV file, over and over,
+    # paced like a real microphone (or `speed` times faster)
+    def __init__(self, samplerate, channels, blocksize, callback, path=None, speed=1.0, gap=2.0):
+        self.fs = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.callback = callback
+        self.speed = speed
+        speech, _ = read_wav(path or SIM_SPEECH_PATH, samplerate)
+        rng = np.random.default_rng(0)
+        noise = rng.normal(0, 0.002, int(gap * samplerate)).astype(np.float32)
+        # noise first, so the voice detector learns the noise floor before anyone speaks
+        self.signal = np.concatenate((noise, speech))
+        self.position = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def next_block(self):
+        indexes = (self.position + np.arange(self.blocksize)) % len(self.signal)
+        self.position = (self.position + self.blocksize) % len(self.signal)
+        return np.repeat(self.signal[indexes][:, None], self.channels, axis=1)
+
+    def run(self):
+        period = self.blocksize / self.fs / self.speed
+        next_block = time.monotonic()
+        while not self.stop_event.is_set():
+            self.callback(self.next_block(), self.blocksize, None, None)
+            next_block += period
+            delay = next_block - time.monotonic()
+            if delay > 0:
+                self.stop_event.wait(delay)
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="sim-mic", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+# the speaker is closed whenever it idles, but a sim recording should hold the whole run,
+# so the open WAV files outlive the streams writing to them
+recordings = {}
+recordings_lock = threading.Lock()
+
+
+def recording(path, samplerate, channels):
+    with recordings_lock:
+        if path not in recordings:
+            wav = wave.open(path, "wb")
+            wav.setnchannels(channels)
+            wav.setsampwidth(2)
+            wav.setframerate(samplerate)
+            recordings[path] = wav
+        return recordings[path]
+
+
+class SimOutputStream:
+    # stands in for sounddevice.OutputStream(dtype="int16"): write() blocks for as long as the
+    # samples would take to play, and optionally appends them to a WAV file
+    def __init__(self, samplerate, channels=1, path=None, speed=1.0):
+        self.fs = samplerate
+        self.channels = channels
+        self.path = path
+        self.speed = speed
+        self.clock = 0
+        self.recording = None
+
+    def start(self):
+        if self.path:
+            self.recording = recording(self.path, self.fs, self.channels)
+
+    def write(self, samples):
+        samples = np.asarray(samples, dtype=np.int16)
+        if self.recording is not None:
+            with recordings_lock:
+                self.recording.writeframes(samples.tobytes())
+        # like a sound card buffer: returns once the previous audio is out and this one is queued
+        now = time.monotonic()
+        delay = self.clock - now
+        if delay > 0:
+            time.sleep(delay)
+        self.clock = max(self.clock, now) + len(samples) / self.channels / self.fs / self.speed
+
+    def stop(self):
+        self.recording = None
+
+    close = stop
+
+
+def input_stream(samplerate, channels, blocksize, callback):
+    kind, path = split_spec(setting("AUDIO_INPUT"))
+    if kind == "sim":
+        return SimInputStream(samplerate, channels, blocksize, callback, path=path, speed=sim_speed())
+    import sounddevice as sd
+    return sd.InputStream(samplerate=samplerate, channels=channels, dtype="float32",
+                          blocksize=blocksize, callback=callback)
+
+
+def output_stream(samplerate, channels=1):
+    kind, path = split_spec(setting("AUDIO_OUTPUT"))
+    if kind == "sim":
+        return SimOutputStream(samplerate, channels, path=path, speed=sim_speed())
+    import sounddevice as sd
+    return sd.OutputStream(samplerate=samplerate, channels=channels, dtype="int16")
@@ -0,0 +1,102 @@
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import butter, sosfilt, sosfilt_zi
+
+# response_format="pcm" is raw 24 kHz 16-bit little-endian mono
+PCM_RATE = 24000
+
+
+class TempoStretcher:
+    # streaming WSOLA time stretch: speeds speech up without changing its pitch (like ffmpeg atempo)
+    def __init__(self, tempo, frame=768, tolerance=128):
+        self.tempo = tempo
+        self.frame = frame
+        self.hop = frame // 2
+        self.tolerance = tolerance
+        self.window = np.hanning(frame + 1)[:frame].astype(np.float32)
+        self.input = np.zeros(0, dtype=np.float32)
+        self.base = 0  # absolute index of self.input[0]
+        self.position = 0.0  # nominal analysis position
+        self.previous = None  # start of the last frame used
+        self.output = np.zeros(frame, dtype=np.float32)
+
+    def process(self, samples):
+        if self.tempo == 1:
+            return samples
+        self.input = np.concatenate((self.input, samples))
+        analysis_hop = self.hop * self.tempo
+        result = []
+
+        while True:
+            nominal = int(round(self.position))
+            low = max(nominal - self.tolerance, self.base)
+            high = nominal + self.tolerance
+            needed = high if self.previous is None else max(high, self.previous + self.hop)
+            if needed + self.frame > self.base + len(self.input):
+                break
+
+            if self.previous is None:
+                start = nominal
+            else:
+                # pick the frame that best continues the waveform we've already output
+                natural = self.previous + self.hop - self.base
+                target = self.input[natural:natural + self.frame]
+                region = self.input[low - self.base:high - self.base + self.frame]
+                start = low + int(np.argmax(np.correlate(region, target, "valid")))
+
+            offset = start - self.base
+            self.output += self.input[offset:offset + self.frame] * self.window
+            result.append(self.output[:self.hop].copy())
+            self.output[:-self.hop] = self.output[self.hop:]
+            self.output[-self.hop:] = 0
+
+            self.previous = start
+            self.position += analysis_hop
+            keep_from = min(self.previous, int(self.position) - self.tolerance)
+            if keep_from > self.base:
+                self.input = self.input[keep_from - self.base:]
+                self.base = keep_from
+
+        if not result:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(result)
+
+    def flush(self):
+        if self.tempo == 1:
+            return np.zeros(0, dtype=np.float32)
+        tail = self.process(np.zeros(self.frame + 2 * self.tolerance, dtype=np.float32))
+        return np.concatenate((tail, self.output[:self.frame - self.hop]))
+
+
+# Frequencies for bandstop filters (in Hz) with narrow gaps
+BANDSTOP_FREQUENCIES = [500, 1000, 2000, 3000, 4000]
+Q_FACTOR = 2  # Adjust this for more or less filtering effect
+
+
+@lru_cache(maxsize=None)
+def robot_voice_sos(fs, order=2):
+    # the five bandstop filters as one cascade of second-order sections, designed once per rate
+    nyquist = 0.5 * fs
+    sections = []
+    for freq in BANDSTOP_FREQUENCIES:
+        lowcut = freq - (freq / Q_FACTOR)
+        highcut = min(freq + (freq / Q_FACTOR), nyquist * 0.99)
+        sections.append(butter(order, [lowcut / nyquist, highcut / nyquist], btype='bandstop', output='sos'))
+    sos = np.concatenate(sections).astype(np.float32)
+    return sos
+
+
+class RobotVoiceFilter:
+    # bandstop "robot voice" that keeps filter state between chunks, so there are no clicks at the joins
+    def __init__(self, fs):
+        self.sos = robot_voice_sos(fs)
+        self.zi = None
+
+    def process(self, samples):
+        signal = np.asarray(samples, dtype=np.float32)
+        if self.zi is None:
+            # start from steady state for the first sample instead of from zero
+            self.zi = (sosfilt_zi(self.sos) * signal[:1]).astype(np.float32)
+        signal, self.zi = sosfilt(self.sos, signal, zi=self.zi)
+        return np.clip(signal, -32768, 32767).astype(np.int16)
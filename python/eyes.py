@@ -1,23 +1,162 @@
-import RPi.GPIO as GPIO
+import math
+import queue
+import threading
 import time
 
+from devices import setting
+
 SERVO_PIN = 10
+POSITION_MIDDLE = 7.5     # Should be the centre for a SG90
 
 
-class BenderEyes:
+class MockPWM:
+    def __init__(self, pin, frequency, log):
+        self.pin = pin
+        self.frequency = frequency
+        self.log = log
+        self.duty_cycle = 0
+
+    def start(self, duty_cycle):
+        self.ChangeDutyCycle(duty_cycle)
+
+    def ChangeDutyCycle(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+        self.log.append((time.monotonic(), duty_cycle))
+
+    def stop(self):
+        self.ChangeDutyCycle(0)
+
+
+class MockGPIO:
+    # the part of RPi.GPIO BenderEyes uses; every duty cycle change lands in `log` as (time, duty)
+    BOARD = "BOARD"
+    OUT = "OUT"
+
     def __init__(self):
-        self.duty_cycle = 7.5     # Should be the centre for a SG90
+        self.log = []
+        self.pins = {}
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setup(self, pin, direction):
+        self.pins[pin] = direction
+
+    def PWM(self, pin, frequency):
+        return MockPWM(pin, frequency, self.log)
+
+    def cleanup(self):
+        self.pins.clear()
+
+
+def load_gpio():
+    # EYES_GPIO=mock (or DEVICES=sim) runs without a Raspberry Pi
+    if setting("EYES_GPIO") == "mock":
+        return MockGPIO()
+    import RPi.GPIO as GPIO
+    return GPIO
+
 
-        GPIO.setmode(GPIO.BOARD)
-        GPIO.setup(SERVO_PIN, GPIO.OUT)
+class BenderEyes:
+    def __init__(self, gpio=None):
+        self.gpio = gpio or load_gpio()
+        self.duty_cycle = POSITION_MIDDLE
+
+        self.gpio.setmode(self.gpio.BOARD)
+        self.gpio.setup(SERVO_PIN, self.gpio.OUT)
 
-        # Create PWM channel on the servo pin with a frequency of 100Hz
-        self.pwm_servo = GPIO.PWM(SERVO_PIN, 50)
+        # Create PWM channel on the servo pin with a frequency of 50Hz
+        self.pwm_servo = self.gpio.PWM(SERVO_PIN, 50)
         self.pwm_servo.start(self.duty_cycle)
 
     def move(self, val):
+        self.duty_cycle = val
         self.pwm_servo.ChangeDutyCycle(val)
-        # self.pwm_servo.ChangeDutyCycle(val)
+
+    def detach(self):
+        # no pulses at all: the servo stops holding and stops jittering, it stays where it is
+        self.pwm_servo.ChangeDutyCycle(0)
 
     def cleanup(self):
         self.pwm_servo.stop()
+
+
+def ease_in_out(t):
+    return 0.5 - 0.5 * math.cos(math.pi * t)
+
+
+class MotionController(threading.Thread):
+    # moves the eyes along eased trajectories at a fixed control rate, off the caller's thread.
+    # move_to() only queues the command, so pipeline state changes never wait for the servo;
+    # the newest command replaces the running trajectory on the next tick, starting from
+    # wherever the eyes are at that moment. once a move is done the servo gets hold_time to
+    # settle and then PWM is detached until the next command
+    def __init__(self, eyes=None, rate=50, speed=10.0, hold_time=0.3):
+        super().__init__(name="eyes", daemon=True)
+        self.eyes = eyes or BenderEyes()
+        self.period = 1 / rate
+        self.speed = speed  # duty cycle percent per second, 10 crosses the whole range in 0.5 s
+        self.hold_time = hold_time
+        self.commands = queue.Queue()
+        self.position = self.eyes.duty_cycle
+
+    def move_to(self, position, duration=None):
+        self.commands.put((position, duration))
+
+    def stop(self):
+        self.commands.put(None)
+
+    def next_command(self, timeout):
+        # the newest queued command wins, older ones are already out of date
+        try:
+            command = self.commands.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        while command is not None:
+            try:
+                command = self.commands.get_nowait()
+            except queue.Empty:
+                break
+        return command
+
+    def run(self):
+        target = self.position
+        start = self.position
+        started = time.monotonic()
+        duration = 0
+        attached = True
+        next_tick = started
+
+        while True:
+            if attached:
+                command = self.next_command(max(0, next_tick - time.monotonic()))
+            else:
+                command = self.next_command(None)
+                next_tick = time.monotonic()
+
+            if command is None:
+                break
+            now = time.monotonic()
+            if command:
+                target, duration = command
+                start = self.position
+                started = now
+                if duration is None:
+                    duration = abs(target - start) / self.speed
+                attached = True
+
+            progress = min(1.0, (now - started) / duration) if duration else 1.0
+            position = start + (target - start) * ease_in_out(progress)
+            if position != self.position or command:
+                self.position = position
+                self.eyes.move(position)
+            if progress >= 1.0 and now - started >= duration + self.hold_time:
+                self.eyes.detach()
+                attached = False
+
+            next_tick += self.period
+            if next_tick < time.monotonic():
+                next_tick = time.monotonic()
+
+        self.eyes.detach()
+        self.eyes.cleanup()
@@ -5,9 +5,19 @@ def on_question_received(question, history):
     """
 
 def on_camera_image(image):
+    #image - кадр з камери: image.array - RGB-масив numpy (лише для читання, не копіюйте без потреби),
+    #image.jpeg() - JPEG-байти, open(image, "rb") - як файл,
+    #image.recent_frames(8) - останні сірі кадри низької роздільності та їхній час (для аналізу руху)
     #Додайте свій код обробки зображення тут
     pass
 
+def on_vision_result(image, description):
+    #Викликається з фонового потоку, коли модель описала кадр (лише з VISION=1)
+    #image - той самий кадр, що й в on_camera_image, description - текст відповіді моделі
+    #Додайте свій код тут
+    pass
+
 def on_audio_recorder(wav_file):
+    #wav_file - WAV-файл у пам'яті (io.BytesIO), читається як звичайний файл
     #Додайте свій код обробки звуку тут
     pass
@@ -1,95 +1,46 @@
 import os
 import threading
-import time
-from random import randint, choice
-
-from audio_recorder import VoiceRecorder
-from ai_whisper import Transcription
-from chatgpt_response import ResponseEngine
-from eyes import BenderEyes
-from text_to_speech import AudioResponse
+
+from eyes import MotionController
 from camera import BenderCamera
-from webui import web_server, get_audio_status
+from integration import on_vision_result
+from pipeline import ConversationPipeline
+import vision
+from webui import web_server, control
 
 POSITION_LEFT = 5
 POSITION_MIDDLE = 7.5
 POSITION_RIGHT = 10
 
-CURRENT_POSITION = POSITION_MIDDLE
-
 cur_dir = os.path.dirname(__file__)
 audio_directory = os.path.join(cur_dir, "..", "audio")
 
-def audio_loop():
-    global CURRENT_POSITION
-    samples = VoiceRecorder()
-    wait_path = os.path.join(audio_directory, "wait.wav")
-
-    history = []
-    censoring = True
-
-    while True:
-        print("Audio Status:", get_audio_status())
-        if not get_audio_status():
-            time.sleep(1)
-            continue
-            
-        CURRENT_POSITION = POSITION_MIDDLE
-        samples.record_voice()
-        # if file doesn't exist, skip
-        if os.path.exists("../audio/output.wav"):
-            CURRENT_POSITION = POSITION_LEFT
-            os.system(f"aplay {wait_path}")
-            transcript = Transcription("../audio/output.wav")
-            transcribed = transcript.write_speech()
-            print(transcribed)
-
-            CURRENT_POSITION = POSITION_RIGHT
-            os.system(f"aplay {wait_path}")
-            response = ResponseEngine(transcribed, history, censoring)
-            censoring = response.censoring
-            r = response.get_response()
-            print(r)
-
-            CURRENT_POSITION = POSITION_MIDDLE
-            os.system(f"aplay {wait_path}")
-            audio = AudioResponse(r)
-            audio.get_audio()
-
-            history.append(
-                {
-                    "role": "user",
-                    "content": transcribed
-                }
-            )
-            history.append({
-                "role": "assistant",
-                "content": r
-            })
-
-            if len(history) > 10:
-                del history[0]
-        else:
-            print("No audio input")
+STATE_POSITIONS = {
+    "listening": POSITION_MIDDLE,
+    "transcribing": POSITION_LEFT,
+    "thinking": POSITION_RIGHT,
+    "speaking": POSITION_MIDDLE,
+}
 
 
-def camera_loop():
-    camera = BenderCamera()
+def audio_loop(eyes):
+    def on_state(state):
+        eyes.move_to(STATE_POSITIONS[state])
 
-    while True:
-        camera.take_picture()
-        time.sleep(5)
+    pipeline = ConversationPipeline(is_enabled=control.is_enabled, on_state=on_state,
+                                    wait_until_enabled=control.wait_until_enabled)
+    pipeline.start()
+    pipeline.join()
 
 
-def eyes_loop():
-    global CURRENT_POSITION
-    eyes = BenderEyes()
-    #positions = [5, 7.5, 10]
-    while True:
-        eyes.move(CURRENT_POSITION)
-        time.sleep(0.5)
-        eyes.move(0)
-        time.sleep(1)
+def camera_loop():
+    # runs continuously, forwarding a frame only when the scene changes
+    camera = BenderCamera()
+    # VISION=1 also sends the forwarded frames to a vision model, off the camera thread
+    scheduler = vision.from_environment(on_vision_result)
+    if scheduler is not None:
+        camera.add_handler(scheduler)
+    camera.run()
 
 
 def main():
@@ -97,22 +48,23 @@ def main():
     web_thread = threading.Thread(target=web_server)
     web_thread.start()
 
+    # eyes thread, follows the pipeline state
+    eyes = MotionController()
+    eyes.start()
+
     # new thread for audio loop
-    audio_thread = threading.Thread(target=audio_loop)
+    audio_thread = threading.Thread(target=audio_loop, args=(eyes,))
     audio_thread.start()
 
     # new thread for camera loop
     camera_thread = threading.Thread(target=camera_loop)
     camera_thread.start()
 
-    # eyes thread
-    eyes_thread = threading.Thread(target=eyes_loop)
-    eyes_thread.start()
-
     # wait for both threads to finish
     audio_thread.join()
     camera_thread.join()
-    eyes_thread.join()
+    eyes.stop()
+    eyes.join()
 
 
 if __name__ == "__main__":
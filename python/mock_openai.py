@@ -0,0 +1,156 @@
+import argparse
+import json
+import math
+import random
+import struct
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the OpenAI endpoints the voice pipeline uses, with realistic delays,
+# so the whole chain can be benchmarked offline:
+#   python mock_openai.py --port 8808
+#   OPENAI_BASE_URL=http://127.0.0.1:8808/v1 OPENAI_API_KEY=mock python bench_voice.py
+
+ANSWER = ("Слухай, м'ясний мішок, я робот Бендер і мені байдуже. "
+          "Але так і бути, відповім тобі коротко. "
+          "Вкуси мій блискучий металевий зад!")
+TRANSCRIPT = "Бендере, як справи?"
+PCM_RATE = 24000
+
+
+class Settings:
+    transcribe_delay = 0.4
+    first_token = 0.35
+    tokens_per_second = 60.0
+    first_audio = 0.3
+    audio_speed = 4.0  # seconds of audio streamed per second of wall time
+    failure_rate = 0.0
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length)
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_chunked(self, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client went away, e.g. an interrupted answer or a closed keep-alive connection
+
+    def do_POST(self):
+        body = self.read_body()
+        if random.random() < Settings.failure_rate:
+            self.send_json(503, {"error": {"message": "mock overloaded", "type": "server_error"}})
+            return
+
+        if self.path.endswith("/audio/transcriptions"):
+            time.sleep(Settings.transcribe_delay)
+            self.send_json(200, {"text": TRANSCRIPT})
+        elif self.path.endswith("/chat/completions"):
+            self.chat(json.loads(body))
+        elif self.path.endswith("/audio/speech"):
+            self.speech(json.loads(body))
+        else:
+            self.send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def chat(self, request):
+        words = ANSWER.split(" ")
+        words = [word + " " for word in words[:-1]] + words[-1:]
+        prompt_tokens = sum(len(str(message.get("content", ""))) // 4 + 4 for message in request["messages"])
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                 "total_tokens": prompt_tokens + len(words)}
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), "model": request["model"]}
+
+        time.sleep(Settings.first_token)
+        if not request.get("stream"):
+            time.sleep(len(words) / Settings.tokens_per_second)
+            self.send_json(200, dict(base, object="chat.completion", usage=usage, choices=[{
+                "index": 0, "finish_reason": "stop",
+                "message": {"role": "assistant", "content": "".join(words)},
+            }]))
+            return
+
+        self.start_chunked("text/event-stream")
+        chunk = dict(base, object="chat.completion.chunk")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(1 / Settings.tokens_per_second)
+            delta = {"content": word} if i else {"role": "assistant", "content": word}
+            self.send_event(dict(chunk, choices=[{"index": 0, "delta": delta, "finish_reason": None}]))
+        self.send_event(dict(chunk, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        if request.get("stream_options", {}).get("include_usage"):
+            self.send_event(dict(chunk, choices=[], usage=usage))
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.end_chunked()
+
+    def send_event(self, payload):
+        self.write_chunk(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+    def speech(self, request):
+        # a vowel-ish tone, about 70 ms of audio per character of input
+        seconds = max(0.5, len(request["input"]) * 0.07)
+        total = int(seconds * PCM_RATE)
+        block = 2400
+        time.sleep(Settings.first_audio)
+        self.start_chunked("audio/pcm")
+        for start in range(0, total, block):
+            count = min(block, total - start)
+            samples = [int(8000 * math.sin(2 * math.pi * 140 * (start + i) / PCM_RATE)) for i in range(count)]
+            self.write_chunk(struct.pack(f"<{count}h", *samples))
+            time.sleep(count / PCM_RATE / Settings.audio_speed)
+        self.end_chunked()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI server for offline pipeline benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--transcribe-delay", type=float, default=Settings.transcribe_delay)
+    parser.add_argument("--first-token", type=float, default=Settings.first_token)
+    parser.add_argument("--tokens-per-second", type=float, default=Settings.tokens_per_second)
+    parser.add_argument("--first-audio", type=float, default=Settings.first_audio)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    Settings.transcribe_delay = args.transcribe_delay
+    Settings.first_token = args.first_token
+    Settings.tokens_per_second = args.tokens_per_second
+    Settings.first_audio = args.first_audio
+    Settings.failure_rate = args.failure_rate
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"Mock OpenAI listening on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
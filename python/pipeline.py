@@ -0,0 +1,243 @@
+import os
+import queue
+import threading
+import time
+
+from audio_recorder import VoiceRecorder
+from ai_whisper import Transcription
+from chatgpt_response import ResponseEngine, summarize_turns
+from conversation_memory import ConversationMemory
+from text_to_speech import AudioResponse, play_cue
+from traces import TraceStore, Turn
+
+cur_dir = os.path.dirname(__file__)
+audio_directory = os.path.join(cur_dir, "..", "audio")
+wait_path = os.path.join(audio_directory, "wait.wav")
+ready_path = os.path.join(audio_directory, "ready.wav")
+
+
+def put_latest(q, item):
+    # enqueue without blocking, dropping the oldest item when the queue is full
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def drain(q):
+    # yields items until a None sentinel; iter(q.get, None) would compare numpy chunks with ==
+    while True:
+        item = q.get()
+        if item is None:
+            return
+        yield item
+
+
+class CuePlayer:
+    # plays short wav cues in the background so stages don't wait for them
+    def __init__(self):
+        self.process = None
+
+    def play(self, path):
+        if self.busy():
+            return
+        self.process = play_cue(path)
+
+    def busy(self):
+        return self.process is not None and self.process.poll() is None
+
+
+class Stage(threading.Thread):
+    # worker that takes items from inbox, calls handler(item, emit) and stops with the pipeline
+    def __init__(self, name, handler, inbox, outbox, stop_event):
+        super().__init__(name=name, daemon=True)
+        self.handler = handler
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop_event = stop_event
+
+    def emit(self, item):
+        # bounded queues give backpressure: a slow consumer blocks its producer
+        while not self.stop_event.is_set():
+            try:
+                self.outbox.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                item = self.inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                self.handler(item, self.emit)
+            except Exception as e:
+                print(f"{self.name} stage failed: {e}")
+
+
+class ConversationPipeline:
+    # capture -> stt -> llm -> tts -> playback, each stage in its own thread.
+    # barge_in lets speech interrupt the answer; it needs a headset or echo
+    # cancellation, otherwise the robot hears itself
+    def __init__(self, is_enabled=None, on_state=None, barge_in=False, queue_size=2, wait_until_enabled=None):
+        self.is_enabled = is_enabled or (lambda: True)
+        # blocks until audio is switched back on or the timeout passes
+        self.wait_until_enabled = wait_until_enabled or (lambda timeout: time.sleep(0.1))
+        self.on_state = on_state or (lambda state: None)
+        self.barge_in = barge_in
+
+        self.recorder = VoiceRecorder()
+        self.cues = CuePlayer()
+        self.stop_event = threading.Event()
+        self.speaking = threading.Event()
+        self.current_audio = None
+
+        summarizer = summarize_turns if os.environ.get("CONVERSATION_SUMMARY", "1") == "1" else None
+        self.history = ConversationMemory(max_tokens=int(os.environ.get("CONVERSATION_MAX_TOKENS", 2000)),
+                                          summarizer=summarizer)
+        self.censoring = True
+        self.traces = TraceStore()
+
+        self.utterances = queue.Queue(maxsize=queue_size)
+        self.transcripts = queue.Queue(maxsize=queue_size)
+        # answers arrive sentence by sentence, leave room for a whole reply
+        self.answers = queue.Queue(maxsize=queue_size * 4)
+        self.speech = queue.Queue(maxsize=queue_size)
+
+        self.threads = [
+            threading.Thread(target=self.capture_loop, name="capture", daemon=True),
+            Stage("stt", self.transcribe, self.utterances, self.transcripts, self.stop_event),
+            Stage("llm", self.respond, self.transcripts, self.answers, self.stop_event),
+            Stage("tts", self.synthesize, self.answers, self.speech, self.stop_event),
+            Stage("playback", self.playback, self.speech, None, self.stop_event),
+        ]
+
+    def start(self):
+        play_cue(ready_path).wait()
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.current_audio is not None:
+            self.current_audio.stop()
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+    def interrupt(self):
+        # drop the rest of the current answer
+        for q in (self.answers, self.speech):
+            while not q.empty():
+                try:
+                    turn = q.get_nowait()[0]
+                except queue.Empty:
+                    break
+                turn.finish("interrupted")
+        audio = self.current_audio
+        if audio is not None:
+            audio.stop()
+
+    def is_muted(self):
+        # don't listen while switched off, to our own cues, nor to our answers unless barge-in is on
+        return (not self.is_enabled() or self.cues.busy()
+                or (self.speaking.is_set() and not self.barge_in))
+
+    def capture_loop(self):
+        while not self.stop_event.is_set():
+            if not self.is_enabled():
+                # the timeout only bounds how long stop() may wait
+                self.wait_until_enabled(0.5)
+                continue
+
+            wav = self.recorder.record_voice(ready_cue=False, is_muted=self.is_muted)
+            if wav is None or not self.is_enabled():
+                continue
+            turn = Turn(on_complete=self.traces.write)
+            turn.mark("capture_end")
+
+            if self.barge_in and self.speaking.is_set() and self.current_audio is not None:
+                print("barge-in, stopping playback")
+                self.interrupt()
+
+            put_latest(self.utterances, (turn, wav))
+
+    def transcribe(self, item, emit):
+        turn, wav = item
+        self.on_state("transcribing")
+        self.cues.play(wait_path)
+        try:
+            transcribed = Transcription(wav).write_speech()
+        except Exception:
+            turn.finish("stt failed")
+            raise
+        turn.mark("stt_done")
+        turn.transcript = transcribed
+        print(transcribed)
+        if transcribed.strip():
+            emit((turn, transcribed))
+        else:
+            turn.finish("empty")
+
+    def respond(self, item, emit):
+        turn, transcribed = item
+        self.on_state("thinking")
+        self.cues.play(wait_path)
+        response = ResponseEngine(transcribed, self.history, self.censoring)
+        self.censoring = response.censoring
+        sentences = 0
+        try:
+            # each sentence goes to TTS as soon as the model finishes it
+            for sentence in response.stream_response():
+                if response.first_token_at is not None:
+                    turn.mark("llm_first_token", response.first_token_at)
+                turn.mark("llm_first_sentence")
+                emit((turn, sentence))
+                sentences += 1
+        except Exception:
+            turn.finish("llm failed")
+            raise
+        # the engine already added the question and the answer to the history
+        print(response.response)
+        turn.response_done(response.response, sentences)
+
+    def synthesize(self, item, emit):
+        turn, text = item
+        # hand the answer to playback right away and keep downloading into its chunk queue
+        audio = AudioResponse(text)
+        chunks = queue.Queue()
+        emit((turn, audio, chunks))
+        try:
+            for chunk in audio.stream_chunks():
+                turn.mark("tts_first_byte")
+                chunks.put(chunk)
+        finally:
+            chunks.put(None)
+
+    def playback(self, item, emit):
+        turn, audio, chunks = item
+        self.on_state("speaking")
+        self.current_audio = audio
+        self.speaking.set()
+
+        def played():
+            for chunk in drain(chunks):
+                turn.mark("playback_start")
+                yield chunk
+
+        try:
+            audio.play_chunks(played())
+        finally:
+            self.speaking.clear()
+            self.current_audio = None
+            turn.sentence_played()
+            if self.speech.empty():
+                self.on_state("listening")
@@ -0,0 +1,108 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+PRIORITIES = {"low": 0, "normal": 1, "high": 2}
+
+
+class PlaybackJob:
+    def __init__(self, text, priority):
+        self.id = uuid.uuid4().hex
+        self.text = text
+        self.priority = priority
+        self.status = "queued"  # queued -> playing -> done / failed, or dropped
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+
+class PlaybackQueue:
+    # single speaker worker: jobs play one at a time, highest priority first, oldest first within a priority.
+    # a text that is already waiting is coalesced with the pending job; when the queue is full
+    # the oldest job of the lowest priority is dropped (or the new one if it is lower still)
+    def __init__(self, play, maxsize=8, history=200):
+        self.play = play
+        self.maxsize = maxsize
+        self.history = history
+        self.pending = []
+        self.jobs = OrderedDict()
+        self.condition = threading.Condition()
+        self.worker = threading.Thread(target=self.run, name="playback-queue", daemon=True)
+        self.worker.start()
+
+    def submit(self, text, priority="normal"):
+        level = PRIORITIES[priority]
+        with self.condition:
+            for job in self.pending:
+                if job.text == text:
+                    job.priority = max(job.priority, level)
+                    return job
+
+            job = PlaybackJob(text, level)
+            self.remember(job)
+            if len(self.pending) >= self.maxsize:
+                victim = min(self.pending, key=lambda j: (j.priority, j.created))
+                if victim.priority > level:
+                    self.finish(job, "dropped")
+                    return job
+                self.pending.remove(victim)
+                self.finish(victim, "dropped")
+
+            self.pending.append(job)
+            self.condition.notify()
+            return job
+
+    def get(self, job_id):
+        with self.condition:
+            return self.jobs.get(job_id)
+
+    def describe(self, job):
+        # status fields change on the worker thread, read them under the lock
+        with self.condition:
+            return job.to_dict()
+
+    def remember(self, job):
+        # forget the oldest finished jobs past `history`; queued and playing ones keep their status
+        # url, there are at most maxsize + 1 of them
+        self.jobs[job.id] = job
+        excess = len(self.jobs) - self.history
+        if excess > 0:
+            finished = [job_id for job_id, old in self.jobs.items() if old.finished is not None][:excess]
+            for job_id in finished:
+                del self.jobs[job_id]
+
+    def finish(self, job, status, error=None):
+        with self.condition:
+            job.status = status
+            job.error = error
+            job.finished = time.time()
+
+    def next_job(self):
+        with self.condition:
+            while not self.pending:
+                self.condition.wait()
+            job = max(self.pending, key=lambda j: (j.priority, -j.created))
+            self.pending.remove(job)
+            job.status = "playing"
+            return job
+
+    def run(self):
+        while True:
+            job = self.next_job()
+            try:
+                self.play(job.text)
+                self.finish(job, "done")
+            except Exception as e:
+                print(f"Failed to play audio: {e}")
+                self.finish(job, "failed", str(e))
@@ -1,15 +1,11 @@
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
-import wave
-import sounddevice as sd
+import threading
 import numpy as np
-from scipy.signal import butter, lfilter
-
-load_dotenv()
-client = OpenAI(
-    api_key=os.environ.get("OPENAI_API_KEY"),
-)
+from functools import lru_cache
+from dsp import PCM_RATE, RobotVoiceFilter, TempoStretcher
+from tts_cache import cache as tts_cache
+from ai_client import Call, for_endpoint
+from devices import output_stream, read_wav
 
 cur_dir = os.path.dirname(__file__)
 save_directory = os.path.join(cur_dir, "..", "audio")
@@ -17,61 +13,193 @@ save_directory = os.path.join(cur_dir, "..", "audio")
 if not os.path.exists(save_directory):
     os.makedirs(save_directory)
 
+CHUNK_BYTES = 4096
+
+
+class PlaybackEngine:
+    # one output stream for answers and cues alike, kept open while audio keeps coming.
+    # after idle_close seconds of silence it is closed, so another process (the web app's
+    # engine, aplay) can open a bare ALSA device that allows only one user
+    def __init__(self, fs=PCM_RATE, idle_close=None):
+        self.fs = fs
+        self.stream = None
+        self.lock = threading.Lock()
+        if idle_close is None:
+            idle_close = float(os.environ.get("PLAYBACK_IDLE_CLOSE", 5))
+        self.idle_close = idle_close
+        self.timer = None
+
+    def open(self):
+        if self.stream is None:
+            self.stream = output_stream(self.fs)
+            self.stream.start()
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def play(self, chunks, should_stop=None):
+        # only one utterance at a time on the speaker
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self.open()
+            try:
+                for chunk in chunks:
+                    if should_stop is not None and should_stop():
+                        break
+                    if len(chunk):
+                        self.stream.write(chunk)
+            finally:
+                if self.idle_close > 0:
+                    self.timer = threading.Timer(self.idle_close, self.close_idle)
+                    self.timer.daemon = True
+                    self.timer.start()
+
+    def close_idle(self):
+        with self.lock:
+            # a newer play() cancelled or replaced this timer while it waited for the lock
+            if self.timer is not threading.current_thread():
+                return
+            self.timer = None
+            self.close()
+
+
+player = PlaybackEngine()
+
+
+@lru_cache(maxsize=None)
+def load_cue(path):
+    samples, _ = read_wav(path, PCM_RATE)
+    return (samples * 32767).astype(np.int16)
+
+
+class Cue:
+    # a short wav file played through the shared engine in the background, with the
+    # poll()/wait() of a Popen. going through the engine keeps the cues from fighting
+    # the answers over the sound device
+    def __init__(self, path):
+        self.path = path
+        self.done = threading.Event()
+        threading.Thread(target=self.run, name="cue", daemon=True).start()
+
+    def run(self):
+        try:
+            samples = load_cue(self.path)
+            step = CHUNK_BYTES // 2
+            player.play(samples[i:i + step] for i in range(0, len(samples), step))
+        except Exception as e:
+            print(f"Failed to play {self.path}: {e}")
+        finally:
+            self.done.set()
+
+    def poll(self):
+        return 0 if self.done.is_set() else None
+
+    def wait(self):
+        self.done.wait()
+        return 0
+
+
+def play_cue(path):
+    return Cue(path)
+
 
 class AudioResponse:
-    def __init__(self, text):
+    def __init__(self, text, tempo=1.4, robot_voice=False, cache=False):
         self.text = text
-        # self.path = path
-
-    def bandstop_filter(self, signal, fs, lowcut, highcut, order=2):
-        nyquist = 0.5 * fs
-        low = lowcut / nyquist
-        high = highcut / nyquist
-        b, a = butter(order, [low, high], btype='bandstop')
-        return lfilter(b, a, signal)
+        self.model = "gpt-4o-mini-tts"
+        self.voice = "onyx"
+        self.tempo = tempo
+        self.robot_voice = robot_voice
+        self.cache = cache
+        self.robot_filter = RobotVoiceFilter(PCM_RATE) if robot_voice else None
+        self.stopped = False
 
     def process(self, buffer, fs):
-        signal = np.frombuffer(buffer, dtype='int16')
-        # Frequencies for bandstop filters (in Hz) with narrow gaps
-        bandstop_frequencies = [500, 1000, 2000, 3000, 4000]
-        q_factor = 2  # Adjust this for more or less filtering effect
+        # stateless one-shot version, kept for callers that filter a whole buffer
+        return RobotVoiceFilter(fs).process(np.frombuffer(buffer, dtype='int16'))
 
-        # Apply each bandstop filter
-        for freq in bandstop_frequencies:
-            lowcut = freq - (freq / q_factor)
-            highcut = freq + (freq / q_factor)
-            signal = self.bandstop_filter(signal, fs, lowcut, highcut)
+    def cache_key(self):
+        return tts_cache.key(self.text, self.voice, self.model, self.tempo, self.robot_voice)
 
-        return signal.astype('int16')
+    def stream_chunks(self):
+        # yields int16 chunks ready for the speaker, from the cache or while still downloading
+        if not self.cache:
+            yield from self.synthesize_chunks()
+            return
 
-    def get_audio(self):
-        # play audio file
-        with client.with_streaming_response.audio.speech.create(
-                model="gpt-4o-mini-tts",
-                voice="onyx",
+        key = self.cache_key()
+        cached = tts_cache.get(key)
+        if cached is not None:
+            step = CHUNK_BYTES // 2
+            for i in range(0, len(cached), step):
+                yield cached[i:i + step]
+            return
+
+        chunks = []
+        for chunk in self.synthesize_chunks():
+            chunks.append(chunk)
+            yield chunk
+        if not self.stopped and chunks:
+            tts_cache.put(key, np.concatenate(chunks))
+
+    def synthesize_chunks(self):
+        stretcher = TempoStretcher(self.tempo)
+        carry = b""
+        with Call("speech") as call, for_endpoint("speech").with_streaming_response.audio.speech.create(
+                model=self.model,
+                voice=self.voice,
                 input=f"{self.text}",
-                response_format="mp3"
+                response_format="pcm"
         ) as response:
-            audio_path = f"{save_directory}/output1.mp3"
-            response.stream_to_file(audio_path)
-
-        os.system(f"ffplay -autoexit -hide_banner -loglevel fatal -af \"atempo=1.4\" {audio_path}")
-
-        return
-        # play audio file: read with wave, play with sounddevice
-
-        with wave.open(audio_path, 'rb') as audio_file:
-            print("Audio file opened")
-            fs = audio_file.getframerate()
-            # read all frames
-            buffer = audio_file.readframes(4 * fs)
-            signal = self.process(buffer, fs)
-            while buffer:
-                # convert binary data to integers
-                # play audio
-                print("Playing audio")
-                sd.play(signal, fs)
-                # wait until audio is done playing
-                buffer = audio_file.readframes(4 * fs)
-                signal = self.process(buffer, fs)
-                sd.wait()
+            for data in response.iter_bytes(CHUNK_BYTES):
+                if self.stopped:
+                    return
+                call.first_byte()
+                data = carry + data
+                # a chunk can end in the middle of a sample
+                usable = len(data) - len(data) % 2
+                carry = data[usable:]
+                samples = np.frombuffer(data[:usable], dtype=np.int16).astype(np.float32)
+                yield self.finish(stretcher.process(samples))
+
+        yield self.finish(stretcher.flush())
+
+    def finish(self, samples):
+        samples = np.clip(samples, -32768, 32767).astype(np.int16)
+        if self.robot_filter is not None and len(samples):
+            samples = self.robot_filter.process(samples)
+        return samples
+
+    def play_chunks(self, chunks):
+        player.play(chunks, should_stop=lambda: self.stopped)
+
+    def stop(self):
+        # interrupt playback started from another thread
+        self.stopped = True
+
+    def get_audio(self):
+        # play audio while it streams in
+        self.play_chunks(self.stream_chunks())
+
+
+def prewarm(texts):
+    # synthesize phrases that aren't cached yet in the background, without playing them
+    def run():
+        for text in texts:
+            audio = AudioResponse(text, cache=True)
+            if audio.cache_key() in tts_cache:
+                continue
+            try:
+                for _ in audio.stream_chunks():
+                    pass
+            except Exception as e:
+                print(f"Failed to prewarm TTS for {text!r}: {e}")
+
+    thread = threading.Thread(target=run, name="tts-prewarm", daemon=True)
+    thread.start()
+    return thread
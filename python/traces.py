@@ -0,0 +1,174 @@
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+cur_dir = os.path.dirname(__file__)
+trace_directory = os.environ.get("TRACE_DIR", os.path.join(cur_dir, "..", "traces"))
+
+MAX_BYTES = int(os.environ.get("TRACE_MAX_BYTES", 5 * 1024 * 1024))
+BACKUPS = 5
+
+# stage intervals shown by the report, as (name, from mark, to mark)
+SPANS = [
+    ("stt", "capture_end", "stt_done"),
+    ("llm first token", "stt_done", "llm_first_token"),
+    ("llm first sentence", "stt_done", "llm_first_sentence"),
+    ("llm total", "stt_done", "llm_done"),
+    ("tts first byte", "llm_first_sentence", "tts_first_byte"),
+    ("to playback", "tts_first_byte", "playback_start"),
+    ("speaking", "playback_start", "playback_end"),
+    ("end to first audio", "capture_end", "playback_start"),
+    ("end to end", "capture_end", "playback_end"),
+]
+
+
+class Turn:
+    # one question and answer, with wall-clock timestamps of every stage it passed.
+    # the answer is spoken sentence by sentence, so the turn is complete once the llm is done
+    # and every sentence it produced has been played
+    def __init__(self, on_complete=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.marks = {}
+        self.transcript = None
+        self.response = None
+        self.outcome = None
+        self.sentences = None
+        self.played = 0
+        self.on_complete = on_complete
+        self.lock = threading.Lock()
+
+    def mark(self, name, at=None):
+        # keeps the first time, so per-sentence stages record when the turn first got there
+        with self.lock:
+            self.marks.setdefault(name, at or time.time())
+
+    def response_done(self, text, sentences):
+        self.mark("llm_done")
+        with self.lock:
+            self.response = text
+            self.sentences = sentences
+        self.check_complete()
+
+    def sentence_played(self):
+        with self.lock:
+            self.played += 1
+        self.check_complete()
+
+    def check_complete(self):
+        with self.lock:
+            if self.outcome is not None or self.sentences is None or self.played < self.sentences:
+                return
+            self.outcome = "answered" if self.sentences else "no answer"
+            self.marks.setdefault("playback_end", time.time())
+        self.complete()
+
+    def finish(self, outcome):
+        with self.lock:
+            if self.outcome is not None:
+                return
+            self.outcome = outcome
+        self.complete()
+
+    def complete(self):
+        if self.on_complete is not None:
+            self.on_complete(self)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "id": self.id,
+                "outcome": self.outcome,
+                "transcript": self.transcript,
+                "response": self.response,
+                "marks": dict(self.marks),
+            }
+
+
+class TraceStore:
+    # append-only jsonl, rotated to traces.jsonl.1 .. .N when it grows past max_bytes
+    def __init__(self, directory=trace_directory, max_bytes=MAX_BYTES, backups=BACKUPS):
+        self.directory = directory
+        self.path = os.path.join(directory, "traces.jsonl")
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, turn):
+        line = json.dumps(turn.to_dict(), ensure_ascii=False) + "\n"
+        with self.lock:
+            try:
+                if os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    self.rotate()
+            except FileNotFoundError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def read(self):
+        # oldest first, across the rotated files
+        paths = sorted(glob.glob(f"{self.path}.*"), key=lambda p: -int(p.rsplit(".", 1)[1]))
+        if os.path.exists(self.path):
+            paths.append(self.path)
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+
+def percentile(values, p):
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def report(turns):
+    answered = [t for t in turns if t["outcome"] == "answered"]
+    outcomes = {}
+    for turn in turns:
+        outcomes[turn["outcome"]] = outcomes.get(turn["outcome"], 0) + 1
+    print(f"{len(turns)} turns: " + ", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items())))
+    if not answered:
+        return
+
+    print(f"{'stage':<20} {'p50':>7} {'p95':>7} {'max':>7}")
+    for name, start, end in SPANS:
+        values = sorted(t["marks"][end] - t["marks"][start] for t in answered
+                        if start in t["marks"] and end in t["marks"])
+        if values:
+            print(f"{name:<20} {percentile(values, 50):6.2f}s {percentile(values, 95):6.2f}s {values[-1]:6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency report of recorded voice turns")
+    parser.add_argument("--last", type=int, default=0, help="only the last N turns")
+    parser.add_argument("--dir", default=trace_directory)
+    parser.add_argument("--show", action="store_true", help="also print the transcripts and answers")
+    args = parser.parse_args()
+
+    turns = list(TraceStore(args.dir).read())
+    if args.last:
+        turns = turns[-args.last:]
+    if args.show:
+        for turn in turns:
+            started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(turn["marks"].get("capture_end", 0)))
+            print(f"{started} [{turn['outcome']}] {turn['transcript']!r} -> {turn['response']!r}")
+        print()
+    report(turns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+cur_dir = os.path.dirname(__file__)
+cache_directory = os.path.join(cur_dir, "..", "audio", "tts_cache")
+
+MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_BYTES", 100 * 1024 * 1024))
+
+
+class TTSCache:
+    # finished TTS audio on disk as raw int16 files named by a hash of everything that shaped them.
+    # file mtime is the last use, the least recently used files go first when over max_bytes
+    def __init__(self, directory=cache_directory, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, text, voice, model, tempo, robot_voice=False):
+        raw = "\x1f".join([text, voice, model, f"{tempo:g}", str(bool(robot_voice))])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.pcm")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            samples = np.fromfile(path, dtype=np.int16)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return samples
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    def put(self, key, samples):
+        path = self.path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        np.asarray(samples, dtype=np.int16).tofile(tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        with self.lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(".pcm"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+cache = TTSCache()
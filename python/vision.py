@@ -0,0 +1,172 @@
+import base64
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from ai_client import Call, for_endpoint
+from camera import encode_jpeg
+
+DEFAULT_PROMPT = "Коротко опиши, що видно на цьому кадрі з камери робота. Одне-два речення."
+
+
+def dhash(gray, size=8):
+    # 64-bit difference hash: average the image down to size x (size + 1) blocks and
+    # record whether each block is brighter than its right neighbour
+    gray = np.asarray(gray, dtype=np.float32)
+    if gray.ndim == 3:
+        gray = gray.mean(axis=2)
+    height, width = gray.shape
+    rows = np.linspace(0, height, size + 1).astype(int)[:-1]
+    cols = np.linspace(0, width, size + 2).astype(int)[:-1]
+    sums = np.add.reduceat(np.add.reduceat(gray, rows, axis=0), cols, axis=1)
+    counts = np.outer(np.diff(np.append(rows, height)), np.diff(np.append(cols, width)))
+    blocks = sums / counts
+    bits = (blocks[:, 1:] > blocks[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def downsize(rgb, max_side=512):
+    # plain striding: cheap, and the model only gets a low-detail image anyway
+    step = max(1, -(-max(rgb.shape[:2]) // max_side))
+    return rgb[::step, ::step]
+
+
+class RateLimiter:
+    # at most `rate` calls per second on average, with bursts of up to `burst`
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class VisionScheduler:
+    # sends camera frames to a multimodal model without ever blocking the camera loop.
+    # submit(frame) returns a Future right away, or None when the frame is dropped:
+    #  - a frame that looks like one already answered (dhash within dedupe_distance) gets the
+    #    cached answer, one that looks like a frame still in flight shares that request
+    #  - at most max_pending requests wait for the rate limiter, newer frames are dropped
+    # on_result(frame, text) is called from a worker thread for every new answer
+    def __init__(self, on_result=None, prompt=DEFAULT_PROMPT, model="gpt-4o-mini", workers=2,
+                 rate=0.5, max_pending=2, dedupe_distance=6, cache_size=256, max_side=512):
+        self.on_result = on_result
+        self.prompt = prompt
+        self.model = model
+        self.max_pending = max_pending
+        self.dedupe_distance = dedupe_distance
+        self.cache_size = cache_size
+        self.max_side = max_side
+        self.limiter = RateLimiter(rate)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vision")
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()  # (prompt, hash) -> answer, least recently used first
+        self.inflight = {}  # (prompt, hash) -> Future
+        self.stats = {"requests": 0, "cached": 0, "shared": 0, "dropped": 0}
+
+    def find(self, mapping, prompt, frame_hash):
+        for key in mapping:
+            if key[0] == prompt and hamming(key[1], frame_hash) <= self.dedupe_distance:
+                return key
+        return None
+
+    def submit(self, frame, prompt=None):
+        prompt = prompt or self.prompt
+        frame_hash = dhash(frame.gray if frame.gray is not None else frame.array)
+
+        with self.lock:
+            key = self.find(self.cache, prompt, frame_hash)
+            if key is not None:
+                self.cache.move_to_end(key)
+                self.stats["cached"] += 1
+                future = Future()
+                future.set_result(self.cache[key])
+                return future
+
+            key = self.find(self.inflight, prompt, frame_hash)
+            if key is not None:
+                self.stats["shared"] += 1
+                return self.inflight[key]
+
+            if len(self.inflight) >= self.max_pending:
+                self.stats["dropped"] += 1
+                return None
+
+            key = (prompt, frame_hash)
+            future = self.executor.submit(self.request, frame, prompt, key)
+            self.inflight[key] = future
+            self.stats["requests"] += 1
+            return future
+
+    def __call__(self, frame):
+        # lets the scheduler be added directly as a camera handler
+        self.submit(frame)
+
+    def request(self, frame, prompt, key):
+        try:
+            image = base64.b64encode(encode_jpeg(downsize(frame.array, self.max_side), quality=75)).decode("ascii")
+            self.limiter.acquire()
+            text = self.ask(prompt, image)
+        except Exception as e:
+            # nobody may be waiting on the future, so say it here too
+            print(f"vision request failed: {e}")
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+        with self.lock:
+            self.cache[key] = text
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        if self.on_result is not None:
+            try:
+                self.on_result(frame, text)
+            except Exception as e:
+                print(f"vision result handler failed: {e}")
+        return text
+
+    def ask(self, prompt, image):
+        with Call("vision") as call:
+            completion = for_endpoint("vision").chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": [
+                    {"type": "text", "text": prompt},
+                    # low detail is a fixed small token cost per image
+                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image}", "detail": "low"}},
+                ]}],
+                max_tokens=150,
+            )
+            call.usage(completion.usage)
+        return completion.choices[0].message.content.strip()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def from_environment(on_result):
+    # VISION=1 turns it on; VISION_RATE is requests per second
+    if os.environ.get("VISION") != "1":
+        return None
+    return VisionScheduler(on_result=on_result, rate=float(os.environ.get("VISION_RATE", 0.5)))
@@ -1,21 +1,67 @@
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, Response, jsonify, render_template_string
+import json
 import os
+import threading
 
 app = Flask(__name__)
 STATUS_FILE = "audio_status.txt"
 
-# Initialize status file if it doesn't exist
-if not os.path.exists(STATUS_FILE):
-    with open(STATUS_FILE, "w") as f:
-        f.write("True")
+
+class AudioControl:
+    # the audio on/off switch, shared in process by the web routes and the pipeline.
+    # waiters wake up as soon as it flips; the file only keeps the setting across restarts
+    def __init__(self, path=STATUS_FILE):
+        self.path = path
+        self.condition = threading.Condition()
+        self.version = 0
+        self.enabled = self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                return f.read().strip() == "True"
+        except FileNotFoundError:
+            self.save(True)
+            return True
+
+    def save(self, enabled):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(enabled))
+        os.replace(tmp_path, self.path)
+
+    def is_enabled(self):
+        return self.enabled
+
+    def set(self, enabled):
+        with self.condition:
+            if enabled == self.enabled:
+                return
+            self.enabled = enabled
+            self.version += 1
+            self.save(enabled)
+            self.condition.notify_all()
+
+    def wait_until_enabled(self, timeout=None):
+        with self.condition:
+            return self.condition.wait_for(lambda: self.enabled, timeout)
+
+    def wait_for_change(self, version, timeout=None):
+        # returns (version, enabled) once the switch moved past version, or the current state on timeout
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version, self.enabled
+
+
+control = AudioControl()
+
 
 def get_audio_status():
-    with open(STATUS_FILE, "r") as f:
-        return f.read().strip() == "True"
+    return control.is_enabled()
+
 
 def set_audio_status(status):
-    with open(STATUS_FILE, "w") as f:
-        f.write(str(status))
+    control.set(bool(status))
 
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -48,29 +94,35 @@ HTML_TEMPLATE = """
     <button class="button" onclick="stopAudio()">Stop Audio</button>
 
     <script>
+        function showStatus(status) {
+            document.getElementById('statusText').textContent = status;
+        }
+
         function updateStatus() {
             fetch('/audio/status')
                 .then(response => response.json())
-                .then(data => {
-                    document.getElementById('statusText').textContent = data.status;
-                });
+                .then(data => showStatus(data.status));
         }
 
         function startAudio() {
             fetch('/audio/start', {method: 'POST'})
                 .then(response => response.json())
-                .then(data => updateStatus());
+                .then(data => showStatus('running'));
         }
 
         function stopAudio() {
             fetch('/audio/stop', {method: 'POST'})
                 .then(response => response.json())
-                .then(data => updateStatus());
+                .then(data => showStatus('stopped'));
         }
 
-        // Update status every 2 seconds
+        // The server pushes every change; EventSource reconnects on its own
         updateStatus();
-        setInterval(updateStatus, 2000);
+        if (window.EventSource) {
+            new EventSource('/audio/events').onmessage = event => showStatus(JSON.parse(event.data).status);
+        } else {
+            setInterval(updateStatus, 2000);
+        }
     </script>
 </body>
 </html>
@@ -96,5 +148,24 @@ def audio_status():
     return jsonify({"status": status})
 
 
+@app.route('/audio/events')
+def audio_events():
+    # server-sent events: the current status right away, then every change
+    def stream():
+        version, enabled = control.version, control.enabled
+        while True:
+            status = "running" if enabled else "stopped"
+            yield f"data: {json.dumps({'status': status})}\n\n"
+            while True:
+                new_version, enabled = control.wait_for_change(version, timeout=15)
+                if new_version != version:
+                    version = new_version
+                    break
+                yield ": keep-alive\n\n"
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 def web_server():
-    app.run(host='0.0.0.0', port=5000)
+    app.run(host='0.0.0.0', port=5000, threaded=True)